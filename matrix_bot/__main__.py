@@ -1,24 +1,31 @@
 import asyncio
 import logging
+import signal
+import socket
 import sys
+import time
+import aiohttp
 from aiohttp import web
 
 import simplematrixbotlib as botlib
 from . import config as config_module
 from . import commands
 from . import webhooks
+from .services import sonarr as sonarr_service
+from .services import radarr as radarr_service
 
 # Import Status and Matrix Utils
 from .utils import status_utils
 from .utils import matrix_utils
 
-# Logging Setup
+# Logging Setup (only if nothing has configured the root logger yet, so re-imports are no-ops)
 log_level = logging.INFO
-logging.basicConfig(
-    level=log_level,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout,
-)
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stdout,
+    )
 logging.getLogger("aiohttp").setLevel(logging.WARNING)
 logging.getLogger("aioopenssl").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
@@ -27,21 +34,91 @@ logger = logging.getLogger(__name__)
 
 
 # Health Check Handlers
+health_routes = web.RouteTableDef()
+
+# Probe bodies are constant, so they are encoded once instead of on every poll
+_OK_BODY = b"OK"
+_READY_BODY = b"Ready"
+_NOT_READY_BODY = b"Not Ready"
+
+@health_routes.get('/healthz')
 async def handle_healthz(request: web.Request):
     """Liveness probe: Checks if the web server process is running."""
-    logger.debug("Received /healthz request")
-    return web.Response(status=200, text="OK")
+    return web.Response(body=_OK_BODY, content_type='text/plain')
 
+@health_routes.get('/readyz')
 async def handle_readyz(request: web.Request):
-    """Readiness probe: Checks if the web server process has started."""
-    logger.debug("Received /readyz request")
-    return web.Response(status=200, text="Ready")
+    """Readiness probe: Serves the cached readiness state kept fresh by refresh_health."""
+    if request.app['health_cache']['ready']:
+        return web.Response(body=_READY_BODY, content_type='text/plain')
+    return web.Response(status=503, body=_NOT_READY_BODY, content_type='text/plain')
+
+async def refresh_health(app: web.Application, bot: botlib.Bot, interval: float = 5):
+    """
+    Background task that refreshes the cached health state every `interval` seconds,
+    so probes never trigger upstream calls themselves.
+    """
+    health_cache = app['health_cache']
+    while True:
+        try:
+            # async_client only exists once the bot has started logging in
+            client = getattr(bot.api, 'async_client', None)
+            health_cache['ready'] = bool(client is not None and client.logged_in)
+        except Exception as e:
+            logger.error("Failed to refresh health cache: %s", e)
+            health_cache['ready'] = False
+        health_cache['ts'] = time.monotonic()
+        await asyncio.sleep(interval)
+
+
+# Seconds to wait for queued webhooks to be delivered during shutdown
+SHUTDOWN_DRAIN_TIMEOUT = 10
+
+
+async def prime_connections(config: config_module.MyConfig):
+    """
+    Makes one authenticated request to each configured *arr service through that service module's
+    pooled session, so DNS, TCP and TLS are already warm for the first webhook or command.
+    """
+    probes = {}
+    if config.radarr_url and config.radarr_api_key:
+        probes["Radarr"] = radarr_service.ping_radarr(config.radarr_url, config.radarr_api_key, verify_tls=config.verify_tls)
+    if config.sonarr_url and config.sonarr_api_key:
+        probes["Sonarr"] = sonarr_service.test_sonarr_connection(config.sonarr_url, config.sonarr_api_key, verify_tls=config.verify_tls)
+    results = await asyncio.gather(*probes.values(), return_exceptions=True)
+    for name, result in zip(probes, results):
+        if isinstance(result, Exception) or result is False:
+            logger.debug("Connection priming for %s failed: %s", name, result)
+    logger.info("Primed connections for %d service(s).", len(probes))
+
+
+async def _safe_close(description: str, coro):
+    """Awaits a cleanup coroutine, logging instead of raising if it fails."""
+    try:
+        await coro
+        logger.info("%s closed.", description)
+    except Exception as e:
+        logger.error("Error closing %s: %s", description, e)
 
 
 # Main Application
 async def main():
     webhook_runner = None
     site = None
+    health_task = None
+    prime_task = None
+    bot_task = None
+    webhook_workers = []
+
+    # --- SHUTDOWN SIGNALS (SIGTERM from Kubernetes/Docker, SIGINT from Ctrl+C) ---
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Not supported on Windows; KeyboardInterrupt still covers Ctrl+C there
+            pass
     # --- FLAG TO PREVENT MULTIPLE STARTUP REPORTS ---
     startup_report_sent = False
     # --- END FLAG ---
@@ -53,6 +130,11 @@ async def main():
     config = config_module.config_instance
     logger.info("Configuration loaded.")
 
+    # Shared HTTP Session (pooled keep-alive connections for service checks and poster downloads)
+    http_connector = aiohttp.TCPConnector(limit=200, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=75)
+    http_session = aiohttp.ClientSession(connector=http_connector, timeout=aiohttp.ClientTimeout(total=10))
+    logger.info("Shared HTTP client session created.")
+
     # Create Bot
     bot = botlib.Bot(config_module.creds)
     logger.info("Matrix Bot instance created.")
@@ -60,7 +142,7 @@ async def main():
     # Register Bot Commands
     prefix = config.command_prefix
     commands.register_all(bot, config, prefix)
-    logger.info(f"Registered bot commands with prefix '{prefix}'.")
+    logger.info("Registered bot commands with prefix '%s'.", prefix)
 
     # --- STARTUP STATUS CHECK ROUTINE (Using target_room_id) ---
     async def run_startup_checks(_unused_arg):
@@ -74,8 +156,9 @@ async def main():
         # --- End Check ---
 
         logger.info("Startup routine initiated...")
+        target_room = config.target_room_id
 
-        if not config.target_room_id:
+        if not target_room:
             logger.warning("No target_room_id configured. Skipping startup status report.")
             # --- Set flag even if skipped, to prevent future attempts ---
             startup_report_sent = True
@@ -86,8 +169,7 @@ async def main():
             status_results = await status_utils.check_all_services(bot, config)
             plain_report, html_report = status_utils.format_status_report(status_results)
 
-            target_room = config.target_room_id
-            logger.info(f"Sending startup status report to target_room_id: {target_room}")
+            logger.info("Sending startup status report to target_room_id: %s", target_room)
             await matrix_utils.send_formatted_message(
                 bot, target_room, plain_report, html_report
             )
@@ -95,22 +177,18 @@ async def main():
             # --- Set flag AFTER successful send ---
             startup_report_sent = True
         except Exception as e:
-            logger.error(f"Failed to perform or send startup status check: {e}", exc_info=True)
+            logger.error("Failed to perform or send startup status check: %s", e, exc_info=True)
             # --- Set flag even on error to prevent retries ---
             startup_report_sent = True
             # Attempt to send an error message if possible
             try:
-                 target_room = config.target_room_id
-                 if target_room:
-                     await matrix_utils.send_formatted_message(
-                        bot, target_room,
-                        "Error: Failed to perform startup status checks.",
-                        "<p>Error: Failed to perform startup status checks. Check logs.</p>"
-                     )
-                 else:
-                     logger.error("Cannot report startup check error: target_room_id is not set.")
+                 await matrix_utils.send_formatted_message(
+                    bot, target_room,
+                    "Error: Failed to perform startup status checks.",
+                    "<p>Error: Failed to perform startup status checks. Check logs.</p>"
+                 )
             except Exception as report_err:
-                 logger.error(f"Failed even to report the startup check error: {report_err}")
+                 logger.error("Failed even to report the startup check error: %s", report_err)
 
     # Register the startup check
     bot.listener.on_startup(run_startup_checks)
@@ -122,33 +200,57 @@ async def main():
     webhook_app = web.Application()
     webhook_app['bot'] = bot
     webhook_app['config'] = config
+    # Config field read on every webhook, pre-extracted so handlers do a single dict lookup
+    webhook_app['target_room_id'] = config.target_room_id
+    webhook_app['http_session'] = http_session
+    webhook_app['health_cache'] = {'ready': False, 'ts': 0}
+    webhook_app['webhook_queue'] = asyncio.Queue(maxsize=webhooks.WEBHOOK_QUEUE_SIZE)
 
-    # Add Routes
-    webhook_app.router.add_post('/webhook/radarr', webhooks.handle_radarr_webhook)
-    logger.info("Registered Radarr webhook route: /webhook/radarr (POST)")
-    webhook_app.router.add_post('/webhook/sonarr', webhooks.handle_sonarr_webhook)
-    logger.info("Registered Sonarr webhook route: /webhook/sonarr (POST)")
-    webhook_app.router.add_get('/healthz', handle_healthz)
-    logger.info("Registered liveness probe route: /healthz (GET)")
-    webhook_app.router.add_get('/readyz', handle_readyz)
-    logger.info("Registered readiness probe route: /readyz (GET)")
+    # Add Routes (static route tables; aiohttp freezes the router when the runner starts)
+    webhook_app.add_routes(webhooks.routes)
+    logger.info("Registered webhook routes: /webhook/radarr, /webhook/sonarr (POST)")
+    webhook_app.add_routes(health_routes)
+    logger.info("Registered probe routes: /healthz, /readyz (GET)")
 
 
     # Prepare Runner and Site
-    webhook_runner = web.AppRunner(webhook_app)
+    # No access log (saves formatting on every webhook) and keep-alive for *arr's sequential deliveries
+    webhook_runner = web.AppRunner(webhook_app, access_log=None, handle_signals=False, keepalive_timeout=75)
     await webhook_runner.setup()
-    site = web.TCPSite(webhook_runner, config.webhook_host, config.webhook_port)
+    # Larger backlog absorbs import storms; SO_REUSEPORT only where the platform supports it
+    site = web.TCPSite(
+        webhook_runner, config.webhook_host, config.webhook_port,
+        backlog=2048, reuse_port=hasattr(socket, 'SO_REUSEPORT')
+    )
     logger.info("Webhook AppRunner setup complete.")
 
 
     # Start Webhook Server & Run Bot
     try:
-        logger.info(f"Attempting to start web server on http://{config.webhook_host}:{config.webhook_port}...")
+        webhook_workers = [
+            asyncio.create_task(webhooks.webhook_worker(webhook_app))
+            for _ in range(webhooks.WEBHOOK_WORKERS)
+        ]
+        logger.info("Started %d webhook worker tasks.", len(webhook_workers))
+
+        logger.info("Attempting to start web server on http://%s:%s...", config.webhook_host, config.webhook_port)
         await site.start()
         logger.info("Web server started successfully.")
 
-        logger.info("Starting Matrix bot main loop (blocking)...")
-        await bot.main() # This blocks until the bot stops
+        health_task = asyncio.create_task(refresh_health(webhook_app, bot, interval=5))
+        logger.info("Started background health cache refresh task.")
+
+        prime_task = asyncio.create_task(prime_connections(config))
+
+        logger.info("Starting Matrix bot main loop (until stopped or signalled)...")
+        bot_task = asyncio.create_task(bot.main())
+        stop_task = asyncio.create_task(stop_event.wait())
+        done, _ = await asyncio.wait({bot_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        if stop_task in done:
+            logger.info("Shutdown signal received, stopping bot and web server...")
+        else:
+            stop_task.cancel()
+            bot_task.result() # Re-raise if the bot loop crashed
 
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt received, stopping bot and web server...")
@@ -157,27 +259,59 @@ async def main():
     finally:
         # Cleanup
         logger.info("Initiating shutdown sequence...")
-        logger.info("Attempting to close Matrix client session...")
-        if bot and bot.api and bot.api.async_client:
-             try:
-                 await bot.api.async_client.close()
-                 logger.info("Matrix client session closed.")
-             except Exception as close_exc:
-                 logger.error(f"Error closing Matrix client session: {close_exc}")
+        if site:
+            # Stop accepting new webhook connections before anything else is torn down
+            await _safe_close("Webhook listening site", site.stop())
+        if health_task:
+            health_task.cancel()
+            try:
+                await health_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Health cache refresh task stopped.")
+        if prime_task and not prime_task.done():
+            prime_task.cancel()
+        if bot_task and not bot_task.done():
+            bot_task.cancel()
+            await asyncio.gather(bot_task, return_exceptions=True)
+            logger.info("Matrix bot main loop stopped.")
+        if webhook_workers:
+            # Let the workers deliver already-accepted webhooks before stopping them
+            try:
+                await asyncio.wait_for(webhook_app['webhook_queue'].join(), timeout=SHUTDOWN_DRAIN_TIMEOUT)
+                logger.info("Webhook queue drained.")
+            except asyncio.TimeoutError:
+                logger.warning("Timed out draining webhook queue; %d webhook(s) dropped.", webhook_app['webhook_queue'].qsize())
+            for worker in webhook_workers:
+                worker.cancel()
+            await asyncio.gather(*webhook_workers, return_exceptions=True)
+            logger.info("Webhook worker tasks stopped.")
+        # Close the Matrix client, shared HTTP sessions and webhook runner concurrently
+        closers = [
+            _safe_close("Shared HTTP client session", http_session.close()),
+            _safe_close("Sonarr service sessions", sonarr_service.close_sonarr_session()),
+            _safe_close("Radarr service sessions", radarr_service.close_radarr_session()),
+        ]
+        matrix_client = getattr(bot.api, 'async_client', None)
+        if matrix_client:
+            closers.append(_safe_close("Matrix client session", matrix_client.close()))
         else:
-             logger.warning("Matrix client session was not available for closing.")
-        logger.info("Cleaning up webhook server runner...")
+            logger.warning("Matrix client session was not available for closing.")
         if webhook_runner:
-            try:
-                await webhook_runner.cleanup()
-                logger.info("Webhook server runner stopped.")
-            except Exception as runner_exc:
-                logger.error(f"Error cleaning up webhook runner: {runner_exc}")
+            closers.append(_safe_close("Webhook server runner", webhook_runner.cleanup()))
         else:
             logger.warning("Webhook runner was not initialized, skipping cleanup.")
+        await asyncio.gather(*closers, return_exceptions=True)
 
 if __name__ == "__main__":
     logger.info("Starting bot application...")
+    # Use uvloop's faster event loop when it is installed (not available on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop.")
+    except ImportError:
+        logger.info("uvloop not installed, using default asyncio event loop.")
     try:
         asyncio.run(main())
     except Exception as global_error:
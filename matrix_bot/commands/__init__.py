@@ -1,5 +1,6 @@
 import logging
-from typing import Dict
+from types import MappingProxyType
+from typing import Dict, Callable
 
 # Import command modules
 from . import help as help_cmd
@@ -18,7 +19,7 @@ def register_all(bot, config, prefix):
 
     # --- Help Registry Setup ---
     # Create the central dictionary to hold help text for all commands
-    help_registry: Dict[str, Dict[str, str]] = {}
+    help_registry: Dict[str, help_cmd.HelpEntry] = {}
     logger.info("Created help registry dictionary.")
 
     # --- Register Help Text from Each Module ---
@@ -31,31 +32,72 @@ def register_all(bot, config, prefix):
         status_cmd.register_help(help_registry, prefix)
         echo_cmd.register_help(help_registry, prefix)
         # Add calls for other command modules here if they exist
-        logger.info(f"Registered help text for commands: {', '.join(help_registry.keys())}")
+        logger.info("Registered help text for commands: %s", ", ".join(help_registry.keys()))
     except AttributeError as e:
         logger.error(f"Error during help registration: A command module is likely missing its 'register_help' function. Details: {e}", exc_info=True)
     except Exception as e:
         logger.error(f"Unexpected error during help registration: {e}", exc_info=True)
 
 
-    # --- Register Command Listeners ---
-    # Pass the completed help_registry ONLY to the help command's listener registration
-    logger.info("Registering command listeners...")
+    # --- Freeze Help Registry ---
+    # The registry is complete now: sort it once and hand out a read-only view
+    sorted_help_items = tuple(sorted(help_registry.items()))
+    frozen_help_registry = MappingProxyType(help_registry)
+
+    # --- Build Command Handlers ---
+    # Pass the completed help_registry ONLY to the help command's handler
+    logger.info("Building command handlers...")
+    handlers: Dict[str, Callable] = {}
     try:
         # Help command needs the registry to display help
-        help_cmd.register(bot, config, prefix, help_registry)
+        name, handler = help_cmd.register(bot, config, prefix, frozen_help_registry, sorted_help_items)
+        handlers[name] = handler
 
         # Other commands just need bot, config, prefix
-        sonarr_cmd.register(bot, config, prefix)
-        radarr_cmd.register(bot, config, prefix)
-        status_cmd.register(bot, config, prefix)
-        echo_cmd.register(bot, config, prefix)
-        # Add calls for other command modules here
-        logger.info("Command listeners registered.")
+        for command_module in (sonarr_cmd, radarr_cmd, status_cmd, echo_cmd):
+            name, handler = command_module.register(bot, config, prefix)
+            # A command name must map to exactly one handler; keep the first and skip duplicates
+            if name in handlers:
+                logger.warning(f"Command '{name}' from {command_module.__name__} is already registered; skipping duplicate handler.")
+                continue
+            handlers[name] = handler
+        # Add other command modules to the tuple above
+        logger.info("Command handlers built: %s", ", ".join(handlers.keys()))
     except AttributeError as e:
-         logger.error(f"Error registering command listener: A command module is likely missing its 'register' function. Details: {e}", exc_info=True)
+         logger.error(f"Error building command handler: A command module is likely missing its 'register' function. Details: {e}", exc_info=True)
     except Exception as e:
-        logger.error(f"Unexpected error during command listener registration: {e}", exc_info=True)
+        logger.error(f"Unexpected error while building command handlers: {e}", exc_info=True)
+
+    # --- Register Single Dispatch Listener ---
+    # One listener for all commands: the command name is looked up once per message
+    # instead of every command handler checking every message.
+    # Sender and room filtering also live here, so individual handlers don't repeat them.
+    prefix_len = len(prefix)
+    prefix_first = prefix[0] if prefix else ""
+    bot_senders = frozenset({config.matrix_user})
+    target_room_id = config.target_room_id
+
+    async def dispatcher(room, message):
+        body = message.body
+        # Cheap first-character check rejects ordinary chat before anything else runs
+        if not body or (prefix_first and body[0] != prefix_first) or not body.startswith(prefix):
+            return
+        # Ignore the bot's own messages and, if configured, anything outside the target room
+        if message.sender in bot_senders:
+            return
+        if target_room_id and room.room_id != target_room_id:
+            return
+        # The command name ends at the first whitespace of any kind (space, tab or newline)
+        rest = body[prefix_len:]
+        if not rest or rest[0].isspace():
+            return
+        words = rest.split(None, 1)
+        handler = handlers.get(words[0].lower())
+        if handler:
+            await handler(room, message)
+
+    bot.listener.on_message_event(dispatcher)
+    logger.info("Command dispatcher registered (1 listener for %d commands).", len(handlers))
 
 
     logger.info("Command registration process complete.")
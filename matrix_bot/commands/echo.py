@@ -2,13 +2,14 @@ import logging
 import simplematrixbotlib as botlib
 from nio import RoomMessageText, MatrixRoom
 from .. import config as config_module # Use the imported config module
-from typing import Dict
+from .help import HelpEntry
+from typing import Dict, Tuple, Callable
 
 logger = logging.getLogger(__name__)
 
 COMMAND_NAME = "echo"
 
-def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
+def register_help(help_registry: Dict[str, HelpEntry], prefix: str):
     """Registers the help text for the echo command."""
     command_key = "echo" # Or use COMMAND_NAME if defined
 
@@ -16,38 +17,38 @@ def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
     description = "Echoes back the message you send."
     usage = f"{prefix}{command_key} <message>"
 
-    # Assign a DICTIONARY to the registry
-    help_registry[command_key] = {
-        "description": description,
-        "usage": usage
-    }
-    logger.debug(f"Registered help for command: {command_key}")
+    help_registry[command_key] = HelpEntry(description=description, usage=usage)
+    logger.debug("Registered help for command: %s", command_key)
 
-async def _echo_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str):
+async def _echo_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str, full_command: str, full_command_len: int):
     """Handles the actual echo command logic after filtering."""
-    full_command = prefix + COMMAND_NAME
+    body = message.body
 
     # --- Add command filtering logic here ---
-    if not message.body.startswith(full_command):
+    if not body.startswith(full_command):
         return # Ignore messages not starting with the command
     # ---------------------------------------
 
     # Extract arguments
-    args_text = message.body[len(full_command):].strip()
-    logger.info(f"Received echo command from {message.sender} in room {room.room_id}")
+    args_text = body[full_command_len:].strip()
+    logger.info("Received echo command from %s in room %s", message.sender, room.room_id)
 
+    send_text = bot.api.send_text_message
     if not args_text:
-        await bot.api.send_text_message(room.room_id, f"Usage: {prefix}echo <message>")
+        await send_text(room.room_id, f"Usage: {prefix}echo <message>")
         return
 
-    await bot.api.send_text_message(room.room_id, args_text)
+    await send_text(room.room_id, args_text)
 
-def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str):
-    """Registers the echo command listener."""
-    async def handler_wrapper(room, message):
+def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str) -> Tuple[str, Callable]:
+    """Builds the echo command handler; returns (command name, handler) for the dispatcher."""
+    # The full command never changes after startup, so build it (and its length) once here
+    full_cmd = prefix + COMMAND_NAME
+    n = len(full_cmd)
+
+    async def handler_wrapper(room, message, _fc=full_cmd, _n=n):
         # Call the actual handler, passing all necessary arguments
-        await _echo_command_handler(room, message, bot, config_obj, prefix)
+        await _echo_command_handler(room, message, bot, config_obj, prefix, _fc, _n)
 
-    # Register the wrapper with the message event listener
-    bot.listener.on_message_event(handler_wrapper)
     logger.info("Echo command registered.")
+    return COMMAND_NAME, handler_wrapper
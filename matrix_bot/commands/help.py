@@ -4,21 +4,74 @@ from nio import RoomMessageText, MatrixRoom
 from .. import config as config_module
 from ..utils import matrix_utils
 import html
-from typing import Dict
+from dataclasses import dataclass
+from typing import Dict, Tuple, Callable, Mapping, Sequence, Optional
 
 logger = logging.getLogger(__name__)
 COMMAND_NAME = "help" # Command name without prefix
 
+# --- Help Registry Entry ---
+@dataclass(frozen=True, slots=True)
+class HelpEntry:
+    """Help text for one command, as stored in the help registry."""
+    description: str
+    usage: Optional[str] = None
+
 # --- Help Registration for THIS command ---
-def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
+def register_help(help_registry: Dict[str, HelpEntry], prefix: str):
     """Registers the help text for the 'help' command itself."""
     command_key = COMMAND_NAME
-    help_registry[command_key] = {
-        "description": "Shows available commands or detailed help for a specific command.",
-        "usage": f"{prefix}{COMMAND_NAME}\n  Shows a list of all available commands.\n\n"
-                 f"{prefix}{COMMAND_NAME} <command>\n  Shows detailed usage for the specified <command>."
-    }
-    logger.debug(f"Registered help for command: {command_key}")
+    help_registry[command_key] = HelpEntry(
+        description="Shows available commands or detailed help for a specific command.",
+        usage=f"{prefix}{COMMAND_NAME}\n  Shows a list of all available commands.\n\n"
+              f"{prefix}{COMMAND_NAME} <command>\n  Shows detailed usage for the specified <command>."
+    )
+    logger.debug("Registered help for command: %s", command_key)
+
+# --- Help Rendering (done once at registration) ---
+def _render_general_help(sorted_help_items: Sequence[Tuple[str, HelpEntry]], prefix: str) -> Tuple[str, str]:
+    """Renders the (plain, html) listing of all registered commands from the pre-sorted registry items."""
+    prefix_esc = html.escape(prefix)
+    plain_parts = [f"Available commands (prefix with '{prefix}'):\n\n"]
+    html_parts = [f"Available commands (prefix with <code>{prefix_esc}</code>):<br/><br/><ul>"]
+    for cmd, info in sorted_help_items: # Sorted once at registration for consistent order
+        plain_parts.append(f"{cmd}: {info.description}\n")
+        html_parts.append(f"<li><strong>{html.escape(cmd)}</strong>: {html.escape(info.description)}</li>")
+    plain_parts.append(f"\nType `{prefix}help <command>` for more details.")
+    html_parts.append(f"</ul><br/>Type <code>{prefix_esc}help &lt;command&gt;</code> for more details.")
+    return "".join(plain_parts), "".join(html_parts)
+
+def _render_command_help(cmd: str, info: HelpEntry, prefix: str) -> Tuple[str, str]:
+    """Renders the (plain, html) detailed help for a single command."""
+    cmd_with_prefix = f"{prefix}{cmd}"
+    cmd_esc_prefix = html.escape(cmd_with_prefix)
+    desc_esc = html.escape(info.description)
+
+    plain_parts = [f"{cmd_with_prefix}\n\n", f"Description: {info.description}\n\n"]
+    html_parts = [f"<strong>{cmd_esc_prefix}</strong><br/><br/>", f"Description: {desc_esc}<br/><br/>"]
+
+    usage = info.usage
+    if usage:
+        # Usage might already contain the prefix, or might assume it.
+        # Let's display it as provided in the registry.
+        usage_esc = html.escape(usage)
+        # Ensure newlines in usage are rendered correctly in HTML <pre>
+        usage_html_formatted = usage_esc.replace('\n', '<br/>')
+        plain_parts.append(f"Usage:\n{usage}")
+        # Use <pre><code> for better formatting of multi-line usage
+        html_parts.append(f"Usage:<br/><pre><code>{usage_html_formatted}</code></pre>")
+    else:
+        plain_parts.append("Usage: N/A")
+        html_parts.append("Usage: N/A")
+    return "".join(plain_parts), "".join(html_parts)
+
+def _render_unknown_command(target_cmd: str, prefix: str) -> Tuple[str, str]:
+    """Renders the (plain, html) reply for a command that is not in the registry."""
+    cmd_esc = html.escape(target_cmd)
+    prefix_esc = html.escape(prefix)
+    plain_body = f"Unknown command: '{target_cmd}'. Type `{prefix}help` to see available commands."
+    html_body = f"Unknown command: <code>{cmd_esc}</code>. Type <code>{prefix_esc}help</code> to see available commands."
+    return plain_body, html_body
 
 # --- Main Command Handler ---
 async def _help_command_handler(
@@ -27,45 +80,26 @@ async def _help_command_handler(
     bot: botlib.Bot,
     config: config_module.MyConfig,
     prefix: str,
-    # --- Accepts the completed registry ---
-    help_registry: Dict[str, Dict[str, str]]
+    # --- Accepts the help bodies pre-rendered from the completed registry ---
+    general_help: Tuple[str, str],
+    command_help: Dict[str, Tuple[str, str]],
+    full_command_prefix: str,
+    full_command_len: int
 ):
-    """Handles the help command using the dynamically built help_registry."""
-    # --- Ignore messages from the bot itself ---
-    if message.sender == config.matrix_user:
-        return
-    # --- Ignore messages not from the target room (if configured) ---
-    if config.target_room_id and room.room_id != config.target_room_id:
-        return
-    # -------------------------------------------
-
-    full_command_prefix = prefix + COMMAND_NAME
-
-    # Only react if the message starts with the help command prefix
-    if not message.body.strip().lower().startswith(full_command_prefix):
+    """Handles the help command using help text pre-rendered from the help_registry."""
+    # Only react if the message starts with the help command prefix.
+    # Normalize just the head of the message so long pastes aren't copied twice to be rejected.
+    if not message.body[:64].lstrip().lower().startswith(full_command_prefix):
         return
 
-    logger.info(f"Received help command from {message.sender} in room {room.room_id}")
+    logger.info("Received help command from %s in room %s", message.sender, room.room_id)
 
-    # Extract arguments after "!help"
-    args_part = message.body[len(full_command_prefix):].strip()
-    args = args_part.split()
-
-    plain_body = ""
-    html_body = ""
+    # Only the first argument after "!help" matters, so split off just that
+    args = message.body[full_command_len:].split(None, 1)
 
     # Case 1: General help (!help)
     if not args:
-        plain_body = f"Available commands (prefix with '{prefix}'):\n\n"
-        html_body = f"Available commands (prefix with <code>{html.escape(prefix)}</code>):<br/><br/><ul>"
-        # --- Use the passed-in help_registry ---
-        for cmd, info in sorted(help_registry.items()): # Sort for consistent order
-            cmd_esc = html.escape(cmd)
-            desc_esc = html.escape(info.get('description', 'No description available.'))
-            plain_body += f"{cmd}: {info.get('description', 'No description available.')}\n"
-            html_body += f"<li><strong>{cmd_esc}</strong>: {desc_esc}</li>"
-        plain_body += f"\nType `{prefix}help <command>` for more details."
-        html_body += f"</ul><br/>Type <code>{html.escape(prefix)}help &lt;command&gt;</code> for more details."
+        plain_body, html_body = general_help
 
     # Case 2: Specific command help (!help <command>)
     else:
@@ -74,36 +108,11 @@ async def _help_command_handler(
         if target_cmd.startswith(prefix):
             target_cmd = target_cmd[len(prefix):]
 
-        # --- Use the passed-in help_registry ---
-        if target_cmd in help_registry:
-            info = help_registry[target_cmd]
-            cmd_with_prefix = f"{prefix}{target_cmd}"
-            cmd_esc_prefix = html.escape(cmd_with_prefix)
-            desc_esc = html.escape(info.get('description', 'N/A'))
-
-            plain_body = f"{cmd_with_prefix}\n\n"
-            html_body = f"<strong>{cmd_esc_prefix}</strong><br/><br/>"
-            plain_body += f"Description: {info.get('description', 'N/A')}\n\n"
-            html_body += f"Description: {desc_esc}<br/><br/>"
-
-            usage = info.get('usage')
-            if usage:
-                # Usage might already contain the prefix, or might assume it.
-                # Let's display it as provided in the registry.
-                usage_esc = html.escape(usage)
-                # Ensure newlines in usage are rendered correctly in HTML <pre>
-                usage_html_formatted = usage_esc.replace('\n', '<br/>')
-                plain_body += f"Usage:\n{usage}"
-                # Use <pre><code> for better formatting of multi-line usage
-                html_body += f"Usage:<br/><pre><code>{usage_html_formatted}</code></pre>"
-            else:
-                plain_body += "Usage: N/A"
-                html_body += "Usage: N/A"
+        rendered = command_help.get(target_cmd)
+        if rendered:
+            plain_body, html_body = rendered
         else:
-            cmd_esc = html.escape(target_cmd)
-            prefix_esc = html.escape(prefix)
-            plain_body = f"Unknown command: '{target_cmd}'. Type `{prefix}help` to see available commands."
-            html_body = f"Unknown command: <code>{cmd_esc}</code>. Type <code>{prefix_esc}help</code> to see available commands."
+            plain_body, html_body = _render_unknown_command(target_cmd, prefix)
 
     # Send the assembled message
     await matrix_utils.send_formatted_message(bot, room.room_id, plain_body, html_body)
@@ -114,15 +123,24 @@ def register(
     bot: botlib.Bot,
     config_obj: config_module.MyConfig,
     prefix: str,
-    # --- Accepts the completed registry from commands/__init__.py ---
-    help_registry: Dict[str, Dict[str, str]]
-):
-    """Registers the help command listener."""
-    # Create a closure to capture bot, config_obj, prefix, AND the help_registry
-    async def handler_wrapper(room, message):
+    # --- Accepts the completed (read-only) registry and its sorted items from commands/__init__.py ---
+    help_registry: Mapping[str, HelpEntry],
+    sorted_help_items: Sequence[Tuple[str, HelpEntry]]
+) -> Tuple[str, Callable]:
+    """Builds the help command handler; returns (command name, handler) for the dispatcher."""
+    # The full command never changes after startup, so build it (and its length) once here
+    full_cmd = prefix + COMMAND_NAME
+    n = len(full_cmd)
+
+    # The registry is complete by now and never changes, so render every help body once
+    general_help = _render_general_help(sorted_help_items, prefix)
+    command_help = {cmd: _render_command_help(cmd, info, prefix) for cmd, info in help_registry.items()}
+
+    # Create a closure to capture bot, config_obj, prefix, AND the rendered help
+    async def handler_wrapper(room, message, _fc=full_cmd, _n=n):
         try:
-            # Pass the captured help_registry to the handler
-            await _help_command_handler(room, message, bot, config_obj, prefix, help_registry)
+            # Pass the captured help bodies to the handler
+            await _help_command_handler(room, message, bot, config_obj, prefix, general_help, command_help, _fc, _n)
         except Exception as handler_exc:
             logger.error(f"Unhandled exception in _help_command_handler: {handler_exc}", exc_info=True)
             # Try to report a generic error back to the room
@@ -135,6 +153,5 @@ def register(
             except Exception as report_exc:
                 logger.error(f"Failed to report internal help handler error to room {room.room_id}: {report_exc}")
 
-    # Register the wrapper function to listen for message events
-    bot.listener.on_message_event(handler_wrapper)
-    logger.info(f"Help command '{prefix}{COMMAND_NAME}' listener registered.")
+    logger.info("Help command '%s%s' handler registered.", prefix, COMMAND_NAME)
+    return COMMAND_NAME, handler_wrapper
@@ -2,20 +2,26 @@ import logging
 import simplematrixbotlib as botlib
 from nio import RoomMessageText, MatrixRoom, RoomSendResponse, RoomSendError # Keep RoomSendError if used elsewhere
 from .. import config as config_module
+from .help import HelpEntry
 from ..services import radarr as radarr_service
 from ..utils import matrix_utils # Import the generic senders
 import html
-from typing import Optional, List, Dict, Any
+import re
+import sys
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from urllib.parse import urljoin
 
 logger = logging.getLogger(__name__)
 
 UNADDED_ONLY_FLAG = "--unadded"
 
+# Markdown characters escaped in user-supplied text, done in a single substitution pass
+_MD_ESCAPE_RE = re.compile(r'([_*`\[\]()])')
+
 COMMAND_NAME = "radarr"
 
 # --- Help Registration ---
-def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
+def register_help(help_registry: Dict[str, HelpEntry], prefix: str):
     """Registers the help text for the radarr command."""
     command_key = COMMAND_NAME # e.g., "radarr"
 
@@ -28,131 +34,143 @@ def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
         f"  Gets detailed info and poster for a specific movie using its TMDb ID."
     )
 
-    # Assign a DICTIONARY to the registry
-    help_registry[command_key] = {
-        "description": description,
-        "usage": usage
-    }
-    logger.debug(f"Registered help for command: {command_key}")
+    help_registry[command_key] = HelpEntry(description=description, usage=usage)
+    logger.debug("Registered help for command: %s", command_key)
+
 
 
 
+async def _reply_many(bot: botlib.Bot, room_id: str, *parts: str):
+    """Joins the given parts into one reply so a command never costs more than one send."""
+    await bot.api.send_text_message(room_id, "\n\n".join(part for part in parts if part))
 
 async def _handle_radarr_info(tmdb_id: int, room: MatrixRoom, bot: botlib.Bot, config: config_module.MyConfig):
-    logger.info(f"Handling radarr info request for TMDb ID: {tmdb_id}")
-    lookup_result = radarr_service.lookup_radarr_movie_by_tmdb(tmdb_id, config.radarr_url, config.radarr_api_key)
-    if lookup_result is None: await bot.api.send_text_message(room.room_id, f"Error: Could not communicate with Radarr API while looking up TMDb ID {tmdb_id}."); return
-    elif not lookup_result: await bot.api.send_text_message(room.room_id, f"Radarr could not find any movie matching TMDb ID {tmdb_id}."); return
+    logger.info("Handling radarr info request for TMDb ID: %s", tmdb_id)
+    lookup_results = await radarr_service.lookup_radarr_movie_by_tmdb(
+        tmdb_id, config.radarr_url, config.radarr_api_key, verify_tls=config.verify_tls
+    )
+    if lookup_results is None: await bot.api.send_text_message(room.room_id, f"Error: Could not communicate with Radarr API while looking up TMDb ID {tmdb_id}."); return
+    elif not lookup_results: await bot.api.send_text_message(room.room_id, f"Radarr could not find any movie matching TMDb ID {tmdb_id}."); return
+    # Assume the first result is the most relevant for direct ID lookup
+    lookup_result = lookup_results[0]
     radarr_movie_id = lookup_result.get('id', 0); is_added = radarr_movie_id > 0
     data_for_card = None; tmdb_id_from_lookup = lookup_result.get('tmdbId')
     if is_added:
-        logger.info(f"TMDb ID {tmdb_id_from_lookup or tmdb_id} found in Radarr with ID {radarr_movie_id}. Fetching details.")
-        details = radarr_service.get_radarr_movie_details(radarr_movie_id, config.radarr_url, config.radarr_api_key)
+        logger.info("TMDb ID %s found in Radarr with ID %s. Fetching details.", tmdb_id_from_lookup or tmdb_id, radarr_movie_id)
+        details = await radarr_service.get_radarr_movie_details(
+            radarr_movie_id, config.radarr_url, config.radarr_api_key, verify_tls=config.verify_tls
+        )
         if not details: await bot.api.send_text_message(room.room_id, f"Found movie with TMDb ID {tmdb_id_from_lookup or tmdb_id} in Radarr, but failed to fetch its details."); return
-        if 'tmdbId' not in details and tmdb_id_from_lookup: details['tmdbId'] = tmdb_id_from_lookup
-        elif 'tmdbId' not in details: details['tmdbId'] = tmdb_id
-        data_for_card = details
+        # details is the cached object shared with other callers, so the card gets a copy
+        data_for_card = details if 'tmdbId' in details else {**details, 'tmdbId': tmdb_id_from_lookup or tmdb_id}
     else:
-        logger.info(f"TMDb ID {tmdb_id_from_lookup or tmdb_id} found via lookup, but not added to Radarr.")
-        if 'tmdbId' not in lookup_result and tmdb_id_from_lookup: lookup_result['tmdbId'] = tmdb_id_from_lookup
-        elif 'tmdbId' not in lookup_result: lookup_result['tmdbId'] = tmdb_id
-        data_for_card = lookup_result
+        logger.info("TMDb ID %s found via lookup, but not added to Radarr.", tmdb_id_from_lookup or tmdb_id)
+        # Lookup results are cached too; copy rather than add the ID in place
+        data_for_card = lookup_result if 'tmdbId' in lookup_result else {**lookup_result, 'tmdbId': tmdb_id}
     if data_for_card:
         await matrix_utils.send_media_info_card(bot=bot, room_id=room.room_id, media_data=data_for_card, is_added=is_added, config=config, media_type='movie')
     else:
         logger.error("Failed to prepare data for Radarr info card."); await bot.api.send_text_message(room.room_id, "An internal error occurred.")
 
+def _build_usage_string(prefix: str) -> str:
+    """Builds the radarr usage text for the configured prefix."""
+    return f"""Usage:\n  `{prefix}{COMMAND_NAME} [search] [{UNADDED_ONLY_FLAG}] <search_term>`\n  `{prefix}{COMMAND_NAME} info <tmdb_id>`"""
+
 # --- Main Command Handler (Uses Generic Formatted Sender for Search) ---
-async def _radarr_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str):
-     # --- Ignore messages from the bot itself ---
-    if message.sender == config.matrix_user:
-        return
-    # -------------------------------------------
-    full_command = prefix + COMMAND_NAME
-    usage_string = f"""Usage:
-  `{prefix}{COMMAND_NAME} [search] [{UNADDED_ONLY_FLAG}] <search_term>`
-  `{prefix}{COMMAND_NAME} info <tmdb_id>`"""
-    if not message.body.startswith(full_command): return
-    args_part = message.body[len(full_command):].strip(); args = args_part.split()
-    if not args: await bot.api.send_text_message(room.room_id, usage_string); return
-
-    if args[0].lower() == "info":
-        # ... (info handling remains the same, calls _handle_radarr_info) ...
-        if len(args) != 2: await bot.api.send_text_message(room.room_id, f"Usage: `{prefix}{COMMAND_NAME} info <tmdb_id>`"); return
+async def _radarr_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str, full_command: str, full_command_len: int, usage_string: str):
+    body = message.body
+    # Bound once; the handler has several reply paths
+    send_text = bot.api.send_text_message; room_id = room.room_id
+    if not body.startswith(full_command): return
+    # Peel off only the subcommand; the rest is tokenized only by the path that needs it
+    head = body[full_command_len:].split(None, 1)
+    if not head: await send_text(room_id, usage_string); return
+    subcommand = head[0]; remainder = head[1] if len(head) > 1 else ""
+
+    if subcommand.lower() == "info":
+        info_args = remainder.split()
+        if len(info_args) != 1: await send_text(room_id, f"Usage: `{prefix}{COMMAND_NAME} info <tmdb_id>`"); return
         try:
-            tmdb_id_arg = int(args[1]);
+            tmdb_id_arg = int(info_args[0]);
             if tmdb_id_arg <= 0: raise ValueError("TMDb ID must be positive.")
-            if not config.radarr_url or not config.radarr_api_key: await bot.api.send_text_message(room.room_id, "Error: Radarr is not configured."); return
+            if not config.radarr_url or not config.radarr_api_key: await _reply_many(bot, room_id, "Error: Radarr is not configured.", usage_string); return
             await _handle_radarr_info(tmdb_id_arg, room, bot, config)
             return
-        except ValueError: await bot.api.send_text_message(room.room_id, f"Invalid TMDb ID. Usage: `{prefix}{COMMAND_NAME} info <tmdb_id>`"); return
+        except ValueError: await send_text(room_id, f"Invalid TMDb ID. Usage: `{prefix}{COMMAND_NAME} info <tmdb_id>`"); return
 
     # --- Search Logic ---
-    show_unadded_only = False; search_term_words = []; args_copy = list(args)
-    if UNADDED_ONLY_FLAG in args_copy: show_unadded_only = True; args_copy.remove(UNADDED_ONLY_FLAG)
-    if args_copy and args_copy[0].lower() == "search": search_term_words = args_copy[1:]
-    else: search_term_words = args_copy
-    if not search_term_words: await bot.api.send_text_message(room.room_id, usage_string); return
+    # Split the flag out of the words in a single pass
+    show_unadded_only = False; search_term_words = []
+    for arg in (subcommand, *remainder.split()):
+        if arg == UNADDED_ONLY_FLAG: show_unadded_only = True
+        else: search_term_words.append(arg)
+    if search_term_words and search_term_words[0].lower() == "search": del search_term_words[0]
+    if not search_term_words: await send_text(room_id, usage_string); return
     search_term = " ".join(search_term_words)
-    if not config.radarr_url or not config.radarr_api_key: await bot.api.send_text_message(room.room_id, "Error: Radarr is not configured."); return
-    logger.info(f"Received radarr search command from {message.sender} (Unadded: {show_unadded_only}) for: '{search_term}'")
-    results = radarr_service.search_radarr_movie(search_term, config.radarr_url, config.radarr_api_key)
+    if not config.radarr_url or not config.radarr_api_key: await _reply_many(bot, room_id, "Error: Radarr is not configured.", usage_string); return
+    logger.info("Received radarr search command from %s (Unadded: %s) for: %r", message.sender, show_unadded_only, search_term)
+    # Repeat searches are served from the service layer's lookup cache
+    results = await radarr_service.search_radarr_movie(
+        search_term, config.radarr_url, config.radarr_api_key, verify_tls=config.verify_tls
+    )
 
-    if results is None: await bot.api.send_text_message(room.room_id, "Error: Radarr API communication failed."); return
-    elif not results: await bot.api.send_text_message(room.room_id, f"No movies found matching '{search_term}'."); return
+    if results is None: await send_text(room_id, "Error: Radarr API communication failed."); return
+    elif not results: await send_text(room_id, f"No movies found matching '{search_term}'."); return
     else:
         # --- Build Search Results List ---
-        added_movies = []; unadded_movies = []
-        max_unadded_to_show = float('inf') if show_unadded_only else 5
-        for movie in results:
-            # ... (logic to populate added/unadded lists remains the same) ...
-            title = movie.get('title', 'N/A'); year = movie.get('year', 'N/A'); tmdb_id = movie.get('tmdbId', 'N/A')
-            is_added = movie.get('id', 0) > 0
-            if is_added:
-                if not show_unadded_only:
-                    status = movie.get('status', 'N/A'); monitored = movie.get('monitored', False); has_file = movie.get('hasFile', False)
-                    status_indicator = ""
-                    if has_file: status_indicator = " (Downloaded)"
-                    elif monitored: status_indicator = " (Monitored)"
-                    elif status != 'released': status_indicator = f" ({status.capitalize()})"
-                    added_movies.append(f"- {title} ({year}) [TMDb: {tmdb_id}]{status_indicator}")
+        # One pass builds both lists and the totals used for the "... and N more" footers
+        added_movies = []; unadded_movies = []; total_added_count = 0; total_unadded_count = 0
+        max_unadded_to_show = sys.maxsize if show_unadded_only else 5
+        for movie in results: # radarr_service.MovieLite entries
+            if movie.id > 0:
+                total_added_count += 1
+                if show_unadded_only: continue
+                status = movie.status or 'N/A'; status_indicator = ""
+                if movie.has_file: status_indicator = " (Downloaded)"
+                elif movie.monitored: status_indicator = " (Monitored)"
+                elif status != 'released': status_indicator = f" ({status.capitalize()})"
+                added_movies.append(f"- {movie.title or 'N/A'} ({movie.year or 'N/A'}) [TMDb: {movie.tmdb_id or 'N/A'}]{status_indicator}")
             else:
-                if len(unadded_movies) < max_unadded_to_show: unadded_movies.append(f"- {title} ({year}) [TMDb: {tmdb_id}]")
+                total_unadded_count += 1
+                # Only format rows that will actually be shown
+                if len(unadded_movies) < max_unadded_to_show: unadded_movies.append(f"- {movie.title or 'N/A'} ({movie.year or 'N/A'}) [TMDb: {movie.tmdb_id or 'N/A'}]")
 
         # --- Format Body (Using Markdown for Radarr Search) ---
         # Note: Radarr search still uses plain text/markdown, not HTML list like Sonarr yet.
-        response_message = ""; search_term_md = search_term.replace('_', r'\_').replace('*', r'\*')
+        # Fragments are collected and joined once at the end
+        search_term_md = _MD_ESCAPE_RE.sub(r'\\\1', search_term)
         if show_unadded_only:
-            response_message = f"Radarr results for '{search_term_md}' (Not Yet Added Only):\n\n"
+            message_parts = [f"Radarr results for '{search_term_md}' (Not Yet Added Only):\n\n"]
             if unadded_movies:
-                 response_message += "\n".join(unadded_movies)
-                 total_unadded_count = sum(1 for m in results if m.get('id', 0) == 0)
-                 if len(unadded_movies) < total_unadded_count: response_message += f"\n... and {total_unadded_count - len(unadded_movies)} more."
-            else: response_message += "No unadded movies found."
+                 message_parts.append("\n".join(unadded_movies))
+                 if len(unadded_movies) < total_unadded_count: message_parts.append(f"\n... and {total_unadded_count - len(unadded_movies)} more.")
+            else: message_parts.append("No unadded movies found.")
         else:
-            response_message = f"Radarr results for '{search_term_md}':\n\n"
-            response_message += "**-- Already Added --**\n"
-            if added_movies: response_message += "\n".join(added_movies)
-            else: response_message += "None found."
-            response_message += "\n\n**-- Not Yet Added --**\n"
+            message_parts = [f"Radarr results for '{search_term_md}':\n\n**-- Already Added --**\n"]
+            message_parts.append("\n".join(added_movies) if added_movies else "None found.")
+            message_parts.append("\n\n**-- Not Yet Added --**\n")
             if unadded_movies:
-                response_message += "\n".join(unadded_movies)
-                total_unadded_count = sum(1 for m in results if m.get('id', 0) == 0)
+                message_parts.append("\n".join(unadded_movies))
                 remaining_unadded = total_unadded_count - len(unadded_movies)
-                if remaining_unadded > 0: response_message += f"\n... and {remaining_unadded} more."
+                if remaining_unadded > 0: message_parts.append(f"\n... and {remaining_unadded} more.")
             else:
-                 total_added_count = sum(1 for m in results if m.get('id', 0) > 0)
-                 if len(results) > 0 and total_added_count == len(results): response_message += "All matches found are added."
-                 else: response_message += "None found."
+                 if len(results) > 0 and total_added_count == len(results): message_parts.append("All matches found are added.")
+                 else: message_parts.append("None found.")
+        response_message = "".join(message_parts)
 
         # Send plain text message for search results
         # If you want HTML lists for Radarr search too, you'd build html_body here
         # and call matrix_utils.send_formatted_message instead.
-        await bot.api.send_text_message(room.room_id, response_message)
+        await send_text(room_id, response_message)
 
 # --- Register Command ---
 # ... (remains the same)
-def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str):
-    async def handler_wrapper(room, message): await _radarr_command_handler(room, message, bot, config_obj, prefix)
-    bot.listener.on_message_event(handler_wrapper)
+def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str) -> Tuple[str, Callable]:
+    """Builds the radarr command handler; returns (command name, handler) for the dispatcher."""
+    # The full command never changes after startup, so build it (and its length) once here
+    full_cmd = prefix + COMMAND_NAME
+    n = len(full_cmd)
+    usage_string = _build_usage_string(prefix)
+    async def handler_wrapper(room, message, _fc=full_cmd, _n=n, _usage=usage_string): await _radarr_command_handler(room, message, bot, config_obj, prefix, _fc, _n, _usage)
     logger.info("Radarr command registered (handles search and info).")
+    return COMMAND_NAME, handler_wrapper
@@ -1,20 +1,51 @@
 import logging
+import re
+import sys
 import simplematrixbotlib as botlib
-from nio import RoomMessageText, MatrixRoom, RoomSendResponse, RoomSendError
+from nio import RoomMessageText, MatrixRoom
 from .. import config as config_module
+from .help import HelpEntry
 from ..services import sonarr as sonarr_service
 from ..utils import matrix_utils # Keep for send_media_info_card
-import html
-from typing import Optional, List, Dict, Any
-from urllib.parse import urljoin
+from typing import Dict, Tuple, Callable
 
 logger = logging.getLogger(__name__)
 
 UNADDED_ONLY_FLAG = "--unadded"
 COMMAND_NAME = "sonarr"
+# --unadded lists are uncapped, so they're sent as several messages of at most this many entries
+RESULTS_CHUNK_SIZE = 25
+
+# Single-pass HTML escaping; same replacements as html.escape(quote=True)
+_HTML_TRANS = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+_NEEDS_ESCAPE_RE = re.compile(r'[&<>"\']')
+
+def _esc(text: str) -> str:
+    """HTML-escapes text, returning it unchanged (no copy) when nothing needs escaping."""
+    return text.translate(_HTML_TRANS) if _NEEDS_ESCAPE_RE.search(text) else text
+
+def _status_plain(monitored: bool, status: str) -> str:
+    """Status suffix for an added series' plain-text row."""
+    if monitored: return " (Monitored)"
+    return f" ({status.capitalize()})" if status != 'ended' else ""
+
+def _status_html(monitored: bool, status: str) -> str:
+    """Status suffix for an added series' HTML row."""
+    if monitored: return " (Monitored)"
+    return f" ({_esc(status.capitalize())})" if status != 'ended' else ""
+
+# --- Static Search Reply Fragments ---
+_ADDED_HEADER_PLAIN = "-- Added --\n"
+_ADDED_HEADER_HTML = "<p><b>-- Added --</b></p>"
+_NOT_ADDED_HEADER_PLAIN = "\n\n-- Not Added --\n"
+_NOT_ADDED_HEADER_HTML = "<p><b>-- Not Added --</b></p>"
+_NONE_FOUND_PLAIN = "None found."
+_NONE_FOUND_HTML = "<p>None found.</p>"
+_NO_UNADDED_PLAIN = "No unadded series found."
+_NO_UNADDED_HTML = "<p>No unadded series found.</p>"
 
 # --- Help Registration ---
-def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
+def register_help(help_registry: Dict[str, HelpEntry], prefix: str):
     """Registers the help text for the sonarr command."""
     command_key = COMMAND_NAME # e.g., "sonarr"
 
@@ -27,11 +58,7 @@ def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
         f"  Gets detailed info and poster for a specific series using its TVDb ID."
     )
 
-    # Assign a DICTIONARY to the registry
-    help_registry[command_key] = {
-        "description": description,
-        "usage": usage
-    }
+    help_registry[command_key] = HelpEntry(description=description, usage=usage)
     logger.debug(f"Registered help for command: {command_key}")
 
 
@@ -64,14 +91,12 @@ async def _handle_sonarr_info(tvdb_id: int, room: MatrixRoom, bot: botlib.Bot, c
         )
         # *** END FIX ***
         if not details: await bot.api.send_text_message(room.room_id, f"Found series with TVDb ID {tvdb_id} in Sonarr, but failed to fetch its details."); return
-        # Ensure TVDb ID is present for the card function
-        if 'tvdbId' not in details: details['tvdbId'] = tvdb_id
-        data_for_card = details
+        # Ensure TVDb ID is present for the card function; details is cached and shared, so copy rather than modify it
+        data_for_card = details if 'tvdbId' in details else {**details, 'tvdbId': tvdb_id}
     else:
         logger.info(f"TVDb ID {tvdb_id} found via lookup, but not added to Sonarr.")
-        # Ensure TVDb ID is present for the card function
-        if 'tvdbId' not in series_lookup_data: series_lookup_data['tvdbId'] = tvdb_id
-        data_for_card = series_lookup_data # Use lookup data directly for unadded
+        # Ensure TVDb ID is present for the card function; lookup results are cached too
+        data_for_card = series_lookup_data if 'tvdbId' in series_lookup_data else {**series_lookup_data, 'tvdbId': tvdb_id} # Lookup data is used directly for unadded
 
     if data_for_card:
         # Pass tvdb_id explicitly if needed by card function, or ensure it's in data_for_card
@@ -84,38 +109,46 @@ async def _handle_sonarr_info(tvdb_id: int, room: MatrixRoom, bot: botlib.Bot, c
 
 
 # --- Main Command Handler ---
-async def _sonarr_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str):
-    if message.sender == config.matrix_user: return
+def _build_usage_string(prefix: str) -> str:
+    """Builds the sonarr usage text for the configured prefix."""
+    return f"""Usage:\n  `{prefix}{COMMAND_NAME} [search] [{UNADDED_ONLY_FLAG}] <search_term>`\n  `{prefix}{COMMAND_NAME} info <tvdb_id>`"""
 
-    full_command = prefix + COMMAND_NAME
-    usage_string = f"""Usage:\n  `{prefix}{COMMAND_NAME} [search] [{UNADDED_ONLY_FLAG}] <search_term>`\n  `{prefix}{COMMAND_NAME} info <tvdb_id>`"""
-    if not message.body.startswith(full_command): return
-    args_part = message.body[len(full_command):].strip(); args = args_part.split()
-    if not args: await bot.api.send_text_message(room.room_id, usage_string); return
+async def _sonarr_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str, full_command_len: int, usage_string: str):
+    # The wrapper has already checked that the message starts with the full command
+    # Only the first word picks the subcommand, so the rest of a long search phrase is never tokenized
+    args_part = message.body[full_command_len:].strip(); parts = args_part.split(None, 1)
+    if not parts: await bot.api.send_text_message(room.room_id, usage_string); return
+    head = parts[0]
 
     # --- Handle 'info' subcommand ---
-    if args[0].lower() == "info":
-        if len(args) != 2: await bot.api.send_text_message(room.room_id, f"Usage: `{prefix}{COMMAND_NAME} info <tvdb_id>`"); return
+    # Length is checked first so most search words never get case-folded
+    if len(head) == 4 and head.casefold() == "info":
+        info_args = parts[1].split() if len(parts) > 1 else []
+        if len(info_args) != 1: await bot.api.send_text_message(room.room_id, f"Usage: `{prefix}{COMMAND_NAME} info <tvdb_id>`"); return
         try:
-            tvdb_id_arg = int(args[1]);
+            tvdb_id_arg = int(info_args[0]);
             if tvdb_id_arg <= 0: raise ValueError("TVDb ID must be positive.")
             if not config.sonarr_url or not config.sonarr_api_key: await bot.api.send_text_message(room.room_id, "Error: Sonarr is not configured."); return
             await _handle_sonarr_info(tvdb_id_arg, room, bot, config) # Call the dedicated info handler
             return
         except ValueError: await bot.api.send_text_message(room.room_id, f"Invalid TVDb ID. Usage: `{prefix}{COMMAND_NAME} info <tvdb_id>`"); return
         except Exception as e:
-            logger.error(f"Error processing 'sonarr info {args[1]}': {e}", exc_info=True)
+            logger.error(f"Error processing 'sonarr info {info_args[0]}': {e}", exc_info=True)
             await bot.api.send_text_message(room.room_id, "An unexpected error occurred while handling the info command.")
             return
 
     # --- Search Logic ---
-    show_unadded_only = False; search_term_words = []; args_copy = list(args)
-    if UNADDED_ONLY_FLAG in args_copy: show_unadded_only = True; args_copy.remove(UNADDED_ONLY_FLAG)
-    # Allow 'search' keyword optionally
-    if args_copy and args_copy[0].lower() == "search": search_term_words = args_copy[1:]
-    else: search_term_words = args_copy # Assume remaining args are the search term
-    if not search_term_words: await bot.api.send_text_message(room.room_id, usage_string); return
-    search_term = " ".join(search_term_words)
+    # The text after the command is the search term; only re-tokenize it when the flag is present
+    search_term = args_part; show_unadded_only = False
+    if UNADDED_ONLY_FLAG in search_term:
+        words = search_term.split()
+        if UNADDED_ONLY_FLAG in words:
+            show_unadded_only = True
+            search_term = " ".join(w for w in words if w != UNADDED_ONLY_FLAG)
+            parts = search_term.split(None, 1)
+    # Drop an optional leading 'search' keyword
+    if parts and len(parts[0]) == 6 and parts[0].casefold() == "search": search_term = parts[1] if len(parts) > 1 else ""
+    if not search_term: await bot.api.send_text_message(room.room_id, usage_string); return
 
     if not config.sonarr_url or not config.sonarr_api_key: await bot.api.send_text_message(room.room_id, "Error: Sonarr is not configured."); return
 
@@ -131,51 +164,55 @@ async def _sonarr_command_handler(room: MatrixRoom, message: RoomMessageText, bo
     elif not lookup_results: await bot.api.send_text_message(room.room_id, f"No series found matching '{search_term}'."); return
     else:
         # --- Build Search Results List ---
-        added_plain = []; added_html = []; unadded_plain = []; unadded_html = []
-        max_unadded = float('inf') if show_unadded_only else 5
-        processed_count = 0
+        max_unadded = sys.maxsize if show_unadded_only else 5
+        max_added = 5 # Display cap for added series; the rest are only counted
+        processed_count = 0; total_added_count = 0; total_unadded_count = 0
 
         # *** Wrap iteration in try...except as lookup_results might not be iterable on error ***
         try:
+            # First pass: classify results, keeping only the entries that will be displayed
+            added_lookups = []; unadded_lookups = []
             for series_lookup_data in lookup_results:
                 processed_count += 1
-                title = series_lookup_data.get('title', 'N/A')
-                year = series_lookup_data.get('year', 'N/A')
-                tvdb_id = series_lookup_data.get('tvdbId', 'N/A')
                 # Check 'id' field; Sonarr V3 often returns 0 if not added, V4 might use 'sonarrId' or similar
                 series_id = series_lookup_data.get('id', 0) # Check if 'id' exists and is > 0
-                is_added = series_id > 0
-                season_count_lookup = series_lookup_data.get('seasonCount', 0)
-
-                line_base = f"{html.escape(title)} ({year}) [TVDb: {tvdb_id}]"
-
-                if is_added:
-                    if not show_unadded_only:
-                        # *** FIX: Add await and verify_tls ***
-                        details = await sonarr_service.get_sonarr_series_details(
-                            series_id, config.sonarr_url, config.sonarr_api_key, verify_tls=config.verify_tls
-                        )
-                        # *** END FIX ***
-                        season_count = season_count_lookup; status = 'N/A'; monitored = False
-                        if details:
-                            seasons_list = details.get('seasons', [])
-                            stats = details.get('statistics', {})
-                            # Prefer season count from details if available
-                            season_count = len(seasons_list) if seasons_list else stats.get('seasonCount', season_count_lookup)
-                            status = details.get('status', 'N/A')
-                            monitored = details.get('monitored', False)
-                        else: logger.warning(f"Could not fetch details for added series ID {series_id} ('{title}') during search list build.")
-
-                        status_ind = ""; status_ind_h = ""
-                        if monitored: status_ind = " (Monitored)"; status_ind_h = " (Monitored)"
-                        elif status != 'ended': status_ind = f" ({status.capitalize()})"; status_ind_h = f" ({html.escape(status.capitalize())})"
-
-                        added_plain.append(f"- {line_base} - {season_count} seasons{status_ind}")
-                        added_html.append(f"<li>{line_base} - {season_count} seasons{status_ind_h}</li>")
-                else: # Not added
-                    if len(unadded_plain) < max_unadded:
-                        unadded_plain.append(f"- {line_base} - {season_count_lookup} seasons")
-                        unadded_html.append(f"<li>{line_base} - {season_count_lookup} seasons</li>")
+                if series_id > 0:
+                    total_added_count += 1
+                    # Added series are never shown with --unadded, nor past the display cap; only the count matters
+                    if not show_unadded_only and len(added_lookups) < max_added: added_lookups.append(series_lookup_data)
+                else:
+                    total_unadded_count += 1
+                    if len(unadded_lookups) < max_unadded: unadded_lookups.append(series_lookup_data)
+
+            # Render unadded rows: (title, tail) pairs, then one comprehension per format
+            unadded_rows = [
+                (d.get('title', 'N/A'), f"({d.get('year', 'N/A')}) [TVDb: {d.get('tvdbId', 'N/A')}] - {d.get('seasonCount', 0)} seasons")
+                for d in unadded_lookups
+            ]
+            unadded_plain = [f"- {title} {tail}" for title, tail in unadded_rows]
+            unadded_html = [f"<li>{_esc(title)} {tail}</li>" for title, tail in unadded_rows]
+
+            # Resolve details for the added series with one bulk /series call (cached briefly).
+            # Nothing is fetched when no added series will be shown (e.g. with --unadded).
+            all_series = {}
+            if added_lookups:
+                all_series = await sonarr_service.get_all_sonarr_series_indexed(
+                    config.sonarr_url, config.sonarr_api_key, verify_tls=config.verify_tls
+                ) or {}
+
+            # Second pass: gather the added rows' display fields in their original order
+            added_rows = []
+            for series_lookup_data in added_lookups:
+                # If the bulk call failed, the lookup entry itself carries status, monitored and seasons
+                details = all_series.get(series_lookup_data['id']) or series_lookup_data
+                seasons_list = details.get('seasons', [])
+                # Prefer season count from details if available
+                season_count = len(seasons_list) if seasons_list else details.get('statistics', {}).get('seasonCount', series_lookup_data.get('seasonCount', 0))
+                # Plain text keeps the raw title; only the HTML variant is escaped
+                tail = f"({series_lookup_data.get('year', 'N/A')}) [TVDb: {series_lookup_data.get('tvdbId', 'N/A')}] - {season_count} seasons"
+                added_rows.append((series_lookup_data.get('title', 'N/A'), tail, details.get('status', 'N/A'), details.get('monitored', False)))
+            added_plain = [f"- {title} {tail}{_status_plain(monitored, status)}" for title, tail, status, monitored in added_rows]
+            added_html = [f"<li>{_esc(title)} {tail}{_status_html(monitored, status)}</li>" for title, tail, status, monitored in added_rows]
 
         except TypeError as te:
              # Catch the specific error if lookup_results wasn't iterable after all
@@ -189,43 +226,57 @@ async def _sonarr_command_handler(room: MatrixRoom, message: RoomMessageText, bo
 
 
         # --- Format Body ---
-        plain_body = ""; html_body = ""; search_term_esc = html.escape(search_term)
-        total_unadded_count = sum(1 for s in lookup_results if s.get('id', 0) == 0)
+        # Fragments are collected and joined once at the end
+        search_term_esc = _esc(search_term)
+        plain_parts = []; html_parts = []
+        follow_up_chunks = [] # (plain, html) bodies sent after the main message
 
         if show_unadded_only:
-            plain_body = f"Sonarr results for '{search_term}' (Not Added Only):\n\n"
-            html_body = f"<p>Sonarr results for '<i>{search_term_esc}</i>' (Not Added Only):</p>"
+            plain_parts.append(f"Sonarr results for '{search_term}' (Not Added Only):\n\n")
+            html_parts.append(f"<p>Sonarr results for '<i>{search_term_esc}</i>' (Not Added Only):</p>")
             if unadded_plain:
-                 plain_body += "\n".join(unadded_plain)
-                 html_body += f"<ul>{''.join(unadded_html)}</ul>"
+                 # The first chunk goes in the main message; the rest follow as their own messages
+                 plain_parts.append("\n".join(unadded_plain[:RESULTS_CHUNK_SIZE]))
+                 html_parts += ("<ul>", "".join(unadded_html[:RESULTS_CHUNK_SIZE]), "</ul>")
+                 for start in range(RESULTS_CHUNK_SIZE, len(unadded_plain), RESULTS_CHUNK_SIZE):
+                     end = start + RESULTS_CHUNK_SIZE
+                     follow_up_chunks.append((
+                         "\n".join(unadded_plain[start:end]),
+                         f"<ul>{''.join(unadded_html[start:end])}</ul>"
+                     ))
                  if len(unadded_plain) < total_unadded_count:
-                     more = f"\n... and {total_unadded_count - len(unadded_plain)} more."
-                     plain_body += more
-                     html_body += f"<p>{html.escape(more).replace(chr(10), '<br>')}</p>" # Use chr(10) for newline
+                     more = f"... and {total_unadded_count - len(unadded_plain)} more."
+                     plain_parts.append(f"\n{more}")
+                     html_parts.append(f"<p><br>{more}</p>")
             else:
-                 plain_body += "No unadded series found."; html_body += "<p>No unadded series found.</p>"
+                 plain_parts.append(_NO_UNADDED_PLAIN); html_parts.append(_NO_UNADDED_HTML)
         else:
-            plain_body = f"Sonarr results for '{search_term}':\n\n"
-            html_body = f"<p>Sonarr results for '<i>{search_term_esc}</i>':</p>"
-            plain_body += "-- Added --\n"; html_body += "<p><b>-- Added --</b></p>"
-            if added_plain: plain_body += "\n".join(added_plain); html_body += f"<ul>{''.join(added_html)}</ul>"
-            else: plain_body += "None found."; html_body += "<p>None found.</p>"
-
-            plain_body += "\n\n-- Not Added --\n"; html_body += "<p><b>-- Not Added --</b></p>"
+            # Only the search-term line is formatted per call
+            plain_parts += (f"Sonarr results for '{search_term}':\n\n", _ADDED_HEADER_PLAIN)
+            html_parts += (f"<p>Sonarr results for '<i>{search_term_esc}</i>':</p>", _ADDED_HEADER_HTML)
+            if added_plain:
+                plain_parts.append("\n".join(added_plain)); html_parts += ("<ul>", "".join(added_html), "</ul>")
+                remaining_added = total_added_count - len(added_plain)
+                if remaining_added > 0:
+                    more = f"... and {remaining_added} more."
+                    plain_parts.append(f"\n{more}")
+                    html_parts.append(f"<p><br>{more}</p>")
+            else: plain_parts.append(_NONE_FOUND_PLAIN); html_parts.append(_NONE_FOUND_HTML)
+
+            plain_parts.append(_NOT_ADDED_HEADER_PLAIN); html_parts.append(_NOT_ADDED_HEADER_HTML)
             if unadded_plain:
-                plain_body += "\n".join(unadded_plain)
-                html_body += f"<ul>{''.join(unadded_html)}</ul>"
+                plain_parts.append("\n".join(unadded_plain))
+                html_parts += ("<ul>", "".join(unadded_html), "</ul>")
                 remaining_unadded = total_unadded_count - len(unadded_plain)
                 if remaining_unadded > 0:
-                    more = f"\n... and {remaining_unadded} more."
-                    plain_body += more
-                    html_body += f"<p>{html.escape(more).replace(chr(10), '<br>')}</p>" # Use chr(10) for newline
+                    more = f"... and {remaining_unadded} more."
+                    plain_parts.append(f"\n{more}")
+                    html_parts.append(f"<p><br>{more}</p>")
             else:
-                 total_added_count = sum(1 for s in lookup_results if s.get('id', 0) > 0)
-                 msg = ""
-                 if processed_count > 0 and total_added_count == processed_count: msg = "All matches are added."
-                 else: msg = "None found."
-                 plain_body += msg; html_body += f"<p>{msg}</p>"
+                 if processed_count > 0 and total_added_count == processed_count: plain_parts.append("All matches are added."); html_parts.append("<p>All matches are added.</p>")
+                 else: plain_parts.append(_NONE_FOUND_PLAIN); html_parts.append(_NONE_FOUND_HTML)
+
+        plain_body = "".join(plain_parts); html_body = "".join(html_parts)
 
         # *** FIX: Send using room_send directly ***
         try:
@@ -248,15 +299,27 @@ async def _sonarr_command_handler(room: MatrixRoom, message: RoomMessageText, bo
                  logger.error(f"Failed to send fallback plain text message for Sonarr search: {fallback_err}")
         # *** END FIX ***
 
+        # Remaining chunks are sent one at a time so they arrive in order
+        for chunk_plain, chunk_html in follow_up_chunks:
+            await matrix_utils.send_formatted_message(bot, room.room_id, chunk_plain, chunk_html)
+
 # *** FIX: De-indent the register function ***
 # --- Register Command ---
-def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str):
-    """Registers the sonarr command handler with the bot."""
+def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str) -> Tuple[str, Callable]:
+    """Builds the sonarr command handler; returns (command name, handler) for the dispatcher."""
+    # Everything that only depends on the prefix is built once here, not per message
+    full_cmd = prefix + COMMAND_NAME
+    n = len(full_cmd)
+    usage_string = _build_usage_string(prefix)
+
     # Create a closure to capture bot, config_obj, and prefix
-    async def handler_wrapper(room, message):
+    async def handler_wrapper(room, message, _fc=full_cmd, _n=n):
+        # Cheap prefix check before entering the handler coroutine
+        body = getattr(message, 'body', None)
+        if not body or not body.startswith(_fc): return
         # Add a top-level try-except within the handler wrapper for safety
         try:
-            await _sonarr_command_handler(room, message, bot, config_obj, prefix)
+            await _sonarr_command_handler(room, message, bot, config_obj, prefix, _n, usage_string)
         except Exception as handler_exc:
             logger.error(f"Unhandled exception in _sonarr_command_handler: {handler_exc}", exc_info=True)
             try:
@@ -265,6 +328,6 @@ def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str):
             except Exception as report_exc:
                 logger.error(f"Failed to report internal handler error to room {room.room_id}: {report_exc}")
 
-    bot.listener.on_message_event(handler_wrapper)
     logger.info("Sonarr command registered (handles search and info).")
+    return COMMAND_NAME, handler_wrapper
 # *** END FIX ***
\ No newline at end of file
@@ -4,16 +4,17 @@ from nio import RoomMessageText, MatrixRoom
 
 # Import your config module structure
 from .. import config as config_module
+from .help import HelpEntry
 # Import the status check utilities AND the message sending utility
 from ..utils import matrix_utils, status_utils
-from typing import Dict
+from typing import Dict, Tuple, Callable
 
 logger = logging.getLogger(__name__)
 
 COMMAND_NAME = "status"
 
 # --- Help Registration ---
-def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
+def register_help(help_registry: Dict[str, HelpEntry], prefix: str):
     """Registers the help text for the status command."""
     command_key = "status" # Or use COMMAND_NAME if defined
 
@@ -24,30 +25,17 @@ def register_help(help_registry: Dict[str, Dict[str, str]], prefix: str):
         f"  Checks the status of all connected services (Matrix, Sonarr, Radarr, etc.).\n\n"
     )
 
-    # Assign a DICTIONARY to the registry
-    help_registry[command_key] = {
-        "description": description,
-        "usage": usage
-    }
+    help_registry[command_key] = HelpEntry(description=description, usage=usage)
     logger.debug(f"Registered help for command: {command_key}")
 
-async def _status_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str):
+async def _status_command_handler(room: MatrixRoom, message: RoomMessageText, bot: botlib.Bot, config: config_module.MyConfig, prefix: str, full_command: str):
     """Handles the !status command."""
-    # --- Check 1: Ignore messages from the bot itself ---
-    if message.sender == config.matrix_user:
-        return
-
-    # --- Check 2: Ignore messages not from the target room ---
-    if config.target_room_id and room.room_id != config.target_room_id:
-        # Log for debugging if needed, but don't clutter normal operation
-        # logger.debug(f"Ignoring command from {message.sender} in room {room.room_id} (not target room)")
-        return
-    # --- End Room Check ---
-
-    full_command = prefix + COMMAND_NAME
-
-    # --- Check 3: Check if the message is the command ---
-    if not message.body.strip().lower() == full_command:
+    # Bot-self and target-room checks are done by the dispatcher before we get here
+    # --- Check if the message is the command ---
+    # strip() returns the same object when there is nothing to strip, and lower() only
+    # runs on text that is already exactly as long as the command.
+    body = message.body.strip()
+    if len(body) != len(full_command) or body.lower() != full_command:
         return
 
     # If we passed all checks, proceed with handling the command
@@ -73,11 +61,13 @@ async def _status_command_handler(room: MatrixRoom, message: RoomMessageText, bo
     await matrix_utils.send_formatted_message(bot, room.room_id, plain_report, html_report)
 
 # --- register function remains the same ---
-def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str):
-    """Registers the status command handler with the bot."""
-    async def handler_wrapper(room, message):
+def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str) -> Tuple[str, Callable]:
+    """Builds the status command handler; returns (command name, handler) for the dispatcher."""
+    full_cmd = (prefix + COMMAND_NAME).lower() # Built once; compared case-insensitively per message
+
+    async def handler_wrapper(room, message, _fc=full_cmd):
         try:
-            await _status_command_handler(room, message, bot, config_obj, prefix)
+            await _status_command_handler(room, message, bot, config_obj, prefix, _fc)
         except Exception as handler_exc:
             logger.error(f"Unhandled exception in _status_command_handler: {handler_exc}", exc_info=True)
             try:
@@ -89,6 +79,6 @@ def register(bot: botlib.Bot, config_obj: config_module.MyConfig, prefix: str):
             except Exception as report_exc:
                 logger.error(f"Failed to report internal status handler error to room {room.room_id}: {report_exc}")
 
-    bot.listener.on_message_event(handler_wrapper)
     logger.info(f"Status command '{prefix}status' registered (target room: {config_obj.target_room_id or 'Any'}).")
+    return COMMAND_NAME, handler_wrapper
 # --- END OF register FUNCTION ---
\ No newline at end of file
@@ -1,53 +1,79 @@
 import json
 import logging
-import sys
-import simplematrixbotlib as botlib
+from dataclasses import dataclass
+from .utils import json_utils
 
 logger = logging.getLogger(__name__)
 
 creds = None
 config_instance = None
 
+@dataclass(frozen=True, slots=True)
 class MyConfig:
-    """Holds bot configuration."""
-    def __init__(self, data: dict):
-        self.matrix_homeserver: str = data.get("matrix_homeserver", "")
-        self.matrix_user: str = data.get("matrix_user", "")
-        self.matrix_password: str = data.get("matrix_password", "")
-        self.target_room_id: str = data.get("target_room_id", "")
-        self.command_prefix: str = data.get("command_prefix", "!")
-        self.sonarr_url: str = data.get("sonarr_url", "")
-        self.sonarr_api_key: str = data.get("sonarr_api_key", "")
-        self.radarr_url: str = data.get("radarr_url", "")
-        self.radarr_api_key: str = data.get("radarr_api_key", "")
-        self.tvdb_base_url: str = data.get("tvdb_base_url", "https://api4.thetvdb.com/v4")
-        self.tvdb_api_key: str = data.get("tvdb_api_key", "")
-        self.verify_tls: bool = data.get("verify_tls", True)
-        # --- Webhook Config ---
-        self.webhook_host: str = data.get("webhook_host", "0.0.0.0")
-        self.webhook_port: int = data.get("webhook_port", 9095)
-        # ----------------------
+    """Holds bot configuration (read-only once loaded)."""
+    matrix_homeserver: str
+    matrix_user: str
+    matrix_password: str
+    target_room_id: str = ""
+    command_prefix: str = "!"
+    sonarr_url: str = ""
+    sonarr_api_key: str = ""
+    radarr_url: str = ""
+    radarr_api_key: str = ""
+    tvdb_base_url: str = "https://api4.thetvdb.com/v4"
+    tvdb_api_key: str = ""
+    verify_tls: bool = True
+    # --- Webhook Config ---
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 9095
+    # ----------------------
 
-        if not self.matrix_homeserver or not self.matrix_user or not self.matrix_password:
+    @classmethod
+    def from_dict(cls, data: dict) -> "MyConfig":
+        """Validates the raw config dict and builds a MyConfig from it."""
+        matrix_homeserver = data.get("matrix_homeserver", "")
+        matrix_user = data.get("matrix_user", "")
+        matrix_password = data.get("matrix_password", "")
+        if not matrix_homeserver or not matrix_user or not matrix_password:
              logger.critical("Matrix credentials missing in config.")
-             global config_instance; config_instance = None
              raise ValueError("Matrix credentials missing.")
-        if not self.command_prefix or len(self.command_prefix) != 1:
-            logger.warning(f"Invalid command prefix '{self.command_prefix}'. Defaulting to '!'")
-            self.command_prefix = "!"
+
+        command_prefix = data.get("command_prefix", "!")
+        if not command_prefix or len(command_prefix) != 1:
+            logger.warning(f"Invalid command prefix '{command_prefix}'. Defaulting to '!'")
+            command_prefix = "!"
         # Optional: Validate webhook port is integer
-        if not isinstance(self.webhook_port, int) or not (0 < self.webhook_port < 65536):
-            logger.warning(f"Invalid webhook port '{self.webhook_port}'. Defaulting to 9095.")
-            self.webhook_port = 9095
+        webhook_port = data.get("webhook_port", 9095)
+        if not isinstance(webhook_port, int) or not (0 < webhook_port < 65536):
+            logger.warning(f"Invalid webhook port '{webhook_port}'. Defaulting to 9095.")
+            webhook_port = 9095
+
+        return cls(
+            matrix_homeserver=matrix_homeserver,
+            matrix_user=matrix_user,
+            matrix_password=matrix_password,
+            target_room_id=data.get("target_room_id", ""),
+            command_prefix=command_prefix,
+            sonarr_url=data.get("sonarr_url", ""),
+            sonarr_api_key=data.get("sonarr_api_key", ""),
+            radarr_url=data.get("radarr_url", ""),
+            radarr_api_key=data.get("radarr_api_key", ""),
+            tvdb_base_url=data.get("tvdb_base_url", "https://api4.thetvdb.com/v4"),
+            tvdb_api_key=data.get("tvdb_api_key", ""),
+            verify_tls=data.get("verify_tls", True),
+            webhook_host=data.get("webhook_host", "0.0.0.0"),
+            webhook_port=webhook_port,
+        )
 
 
 def load_config(path: str) -> MyConfig | None:
     """Loads configuration from a JSON file."""
     global creds, config_instance
+    import simplematrixbotlib as botlib # Only needed for Creds; kept out of the module's import path
     try:
         logger.info(f"Attempting to load configuration from: {path}") # Added logging
-        with open(path, 'r') as f: config_data = json.load(f)
-        config_instance = MyConfig(config_data)
+        with open(path, 'rb') as f: config_data = json_utils.loads(f.read()) # orjson when available
+        config_instance = MyConfig.from_dict(config_data)
         creds = botlib.Creds(
             config_instance.matrix_homeserver, config_instance.matrix_user, config_instance.matrix_password
         )
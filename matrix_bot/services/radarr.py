@@ -1,16 +1,44 @@
 import asyncio # Added
 import aiohttp  # Added
+import contextlib
+import functools
 import logging
+import random
 import ssl      # Added for verify_tls handling
-from urllib.parse import urljoin
-from typing import Optional, List, Dict, Any # Ensure these are imported
+import yarl     # aiohttp's own URL type
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple # Ensure these are imported
+
+from ..utils import json_utils
+from ..utils.cache import TTLCache, ttl_cached
 
 logger = logging.getLogger(__name__)
 
+__all__ = [
+    "MovieLite",
+    "RadarrClient",
+    "get_radarr_client",
+    "ping_radarr",
+    "search_radarr_movie",
+    "lookup_radarr_movie_by_tmdb",
+    "get_radarr_movie_details",
+    "bulk_get_radarr_movie_details",
+    "bulk_lookup_radarr_movie_by_tmdb",
+    "close_radarr_session",
+]
+
 # Default timeout in seconds - can be adjusted
 REQUEST_TIMEOUT = 15
+# An unreachable host fails after this many seconds instead of the full REQUEST_TIMEOUT
+CONNECT_TIMEOUT = 3
+# Most requests in flight at once per Radarr instance. Radarr's SQLite backend slows down under
+# heavy concurrency, so bulk work is queued on our side instead.
+RADARR_MAX_CONCURRENCY = 8
 
 # --- Helper for TLS verification (Copied from sonarr.py) ---
+# Cached: building a context is costly, and sharing one lets connections reuse TLS sessions.
+# This also means the "verification disabled" warning is logged once, not per request.
+@functools.lru_cache(maxsize=2)
 def _get_ssl_context(verify_tls: bool):
     if verify_tls:
         return None # Use default SSL context which verifies
@@ -22,190 +50,305 @@ def _get_ssl_context(verify_tls: bool):
         logger.warning("TLS verification is DISABLED for Radarr requests.")
         return context
 
-# --- *** ADD PING FUNCTION (mirrors sonarr's test_sonarr_connection) *** ---
-async def ping_radarr(radarr_url: str, api_key: str, verify_tls: bool = True) -> bool:
-    """(Async) Tests the connection and authentication to the Radarr API using /system/status."""
-    if not radarr_url or not api_key:
-        logger.error("Cannot test Radarr connection: URL or API Key is missing.")
-        return False
+# --- Shared HTTP Sessions ---
+# One pooled session per (Radarr base URL, API key, verify_tls), so repeat requests reuse keep-alive
+# connections instead of paying a new TCP + TLS handshake each time. The API key is a session default
+# header, built once rather than passed with every request.
+_sessions: Dict[Tuple[str, str, bool], aiohttp.ClientSession] = {}
+
+async def _get_session(radarr_url: str, api_key: str, verify_tls: bool) -> aiohttp.ClientSession:
+    """(Async) Returns the shared session for this Radarr instance, creating it on first use."""
+    key = (radarr_url, api_key, verify_tls)
+    session = _sessions.get(key)
+    if session is None or session.closed:
+        ssl_context = _get_ssl_context(verify_tls)
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=64, limit_per_host=16, keepalive_timeout=75,
+                ssl=ssl_context if ssl_context is not None else True
+            ),
+            # Connecting fails fast; once connected, a large response only has to keep arriving
+            # (each read within REQUEST_TIMEOUT) rather than finish within one overall budget
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=REQUEST_TIMEOUT),
+            # Lookup payloads are large, repetitive JSON. aiohttp already advertises gzip/deflate (and br
+            # when Brotli is installed) via Accept-Encoding, so that default is kept rather than narrowed.
+            headers={'X-Api-Key': api_key, 'Accept': 'application/json'},
+            auto_decompress=True,
+            json_serialize=json_utils.dumps
+        )
+        _sessions[key] = session
+    return session
 
-    if not radarr_url.startswith(('http://', 'https://')):
-         logger.warning(f"Radarr URL '{radarr_url}' is missing scheme, defaulting to http://")
-         radarr_url = 'http://' + radarr_url
-
-    api_endpoint = urljoin(radarr_url, '/api/v3/system/status') # Radarr also uses v3
-    headers = {'X-Api-Key': api_key}
-    ssl_context = _get_ssl_context(verify_tls)
-
-    try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session: # Shorter timeout for test
-            logger.info(f"Testing async Radarr connection to {api_endpoint}...")
-            async with session.get(api_endpoint, headers=headers, ssl=ssl_context) as response:
-                response.raise_for_status()
-                # Optionally check response content if needed, e.g., version
-                status_data = await response.json()
-                if isinstance(status_data, dict) and 'version' in status_data:
-                     logger.info(f"Radarr connection test successful ({api_endpoint}, Version: {status_data.get('version', 'N/A')}).")
-                     return True
+async def close_radarr_session():
+    """(Async) Closes every shared Radarr session that was opened."""
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
+
+# --- Shared GET Helper (retries transient failures) ---
+# Radarr briefly answers 502/503 while it is busy (e.g. during library scans); those are worth retrying
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+async def _radarr_get(
+    session: aiohttp.ClientSession, api_endpoint: yarl.URL, *, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, str]] = None,
+    description: str = "Radarr request", max_retries: int = 3, base_delay: float = 1.0,
+    etag_cache: Optional[TTLCache] = None, etag_key: Optional[Tuple] = None, limiter: Optional[asyncio.Semaphore] = None, **request_kwargs
+) -> Optional[Any]:
+    """
+    (Async) GETs a Radarr API endpoint and returns the decoded JSON, or None on failure (errors are logged).
+    Timeouts, connection errors and RETRY_STATUSES responses are retried with exponential backoff plus jitter;
+    other HTTP errors (401, 404, ...) fail immediately.
+    With an etag_cache, the request is conditional: a 304 returns the cached body without downloading it again.
+    A limiter is held for each attempt only, so backoff sleeps between retries don't occupy a slot.
+    """
+    cached_etag = etag_cache.get(etag_key) if etag_cache is not None else None
+    if cached_etag is not None:
+        headers = {**(headers or {}), 'If-None-Match': cached_etag[0]}
+    for attempt in range(1, max_retries + 1):
+        try:
+            async with limiter or contextlib.nullcontext(), session.get(api_endpoint, headers=headers, params=params, **request_kwargs) as response:
+                status = response.status
+                # Error statuses are handled here rather than via raise_for_status(), while the body
+                # (often Radarr's error message) can still be read for the log
+                if status >= 400:
+                    body_preview = await response.text()
+                    if status not in RETRY_STATUSES:
+                        if status == 401:
+                            logger.error(f"{description} failed ({api_endpoint}): Authentication error (Invalid API Key?). Status: 401")
+                        else:
+                            logger.error(f"{description} failed ({api_endpoint}): HTTP {status} - {response.reason}. Body: {body_preview[:200]}...")
+                        return None
+                    reason = f"HTTP {status} - {response.reason}"
+                elif status == 304 and cached_etag is not None:
+                    logger.debug(f"{description} unchanged (304); using cached response.")
+                    return cached_etag[1]
                 else:
-                     logger.warning(f"Radarr connection test to {api_endpoint} successful, but response format unexpected: {status_data}")
-                     return True # Still counts as success if status was 2xx
+                    try:
+                        data = await response.json(loads=json_utils.loads) # orjson when available
+                        etag = response.headers.get('ETag')
+                        if etag_cache is not None and etag:
+                            etag_cache[etag_key] = (etag, data)
+                        return data
+                    except aiohttp.ContentTypeError:
+                        body_preview = await response.text()
+                        logger.error(f"Failed to decode JSON response from {description} ({api_endpoint}). Status: {status}, Body: {body_preview[:200]}...")
+                        return None
+        except asyncio.TimeoutError:
+            reason = "Request timed out"
+        except aiohttp.ClientConnectionError as e:
+            reason = f"Connection error - {e}"
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during {description} ({api_endpoint}): {e}", exc_info=True)
+            return None
 
-    except asyncio.TimeoutError:
-        logger.error(f"Radarr connection test failed: Timeout connecting to {api_endpoint}")
-        return False
-    except aiohttp.ClientResponseError as e:
-        if e.status == 401:
-            logger.error(f"Radarr connection test failed: Authentication error (Invalid API Key?). Status: 401 ({api_endpoint})")
+        if attempt == max_retries:
+            logger.error(f"{description} failed ({api_endpoint}): {reason}. Giving up after {attempt} attempt(s).")
+            return None
+        delay = base_delay * 2 ** (attempt - 1) * (1 + random.random() * 0.5)
+        logger.warning(f"{description} failed ({api_endpoint}): {reason}. Retrying in {delay:.1f}s (attempt {attempt}/{max_retries}).")
+        await asyncio.sleep(delay)
+    return None
+
+# --- Per-Instance Concurrency Limit ---
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _get_semaphore(radarr_url: str) -> asyncio.Semaphore:
+    """Returns the semaphore limiting concurrent requests to this Radarr instance."""
+    sem = _semaphores.get(radarr_url)
+    if sem is None:
+        sem = _semaphores[radarr_url] = asyncio.Semaphore(RADARR_MAX_CONCURRENCY)
+    return sem
+
+# --- Conditional Request Cache ---
+# Movie details keep their ETag, so refetching an unchanged movie is answered with an empty 304.
+_DETAILS_ETAG_CACHE = TTLCache(maxsize=512, ttl=3600) # (base URL, movie ID) -> (etag, details)
+
+# --- Search Result Entry ---
+@dataclass(frozen=True, slots=True)
+class MovieLite:
+    """
+    The parts of a movie lookup result that search listings use. Cached search results hold these
+    instead of full lookup dicts (cast, crew, alternate titles, ...). id is > 0 only for added movies.
+    """
+    id: int
+    title: Optional[str]
+    year: Optional[int]
+    tmdb_id: Optional[int]
+    imdb_id: Optional[str]
+    overview: Optional[str]
+    poster_url: Optional[str]
+    status: Optional[str]
+    monitored: bool
+    has_file: bool
+
+    @classmethod
+    def from_lookup(cls, movie: Dict[str, Any]) -> "MovieLite":
+        """Builds a MovieLite from one Radarr movie lookup result."""
+        get = movie.get
+        return cls(
+            id=get('id') or 0,
+            title=get('title'),
+            year=get('year'),
+            tmdb_id=get('tmdbId'),
+            imdb_id=get('imdbId'),
+            overview=get('overview'),
+            poster_url=next((img.get('remoteUrl') for img in get('images') or () if img.get('coverType') == 'poster'), None),
+            status=get('status'),
+            monitored=bool(get('monitored', False)),
+            has_file=bool(get('hasFile', False)),
+        )
+
+# --- Radarr Client ---
+class RadarrClient:
+    """
+    One Radarr instance: the base URL is validated and scheme-normalized once, and the endpoints,
+    auth headers and TLS mode are kept together. Get instances from get_radarr_client().
+    """
+    __slots__ = ('base_url', 'api_key', 'verify_tls', 'headers', 'status_url', 'lookup_url', 'movie_url')
+
+    def __init__(self, radarr_url: str, api_key: str, verify_tls: bool = True):
+        if not radarr_url.startswith(('http://', 'https://')):
+            logger.warning(f"Radarr URL '{radarr_url}' is missing scheme, defaulting to http://")
+            radarr_url = 'http://' + radarr_url
+        self.base_url = radarr_url
+        self.verify_tls = verify_tls
+        self.api_key = api_key
+        self.headers = {'X-Api-Key': api_key} # For requests on sessions other than our own
+        # Absolute API paths replace any path on the configured URL (same as urljoin did)
+        base = yarl.URL(radarr_url)
+        self.status_url = base.with_path('/api/v3/system/status') # Radarr also uses v3
+        self.lookup_url = base.with_path('/api/v3/movie/lookup')
+        self.movie_url = base.with_path('/api/v3/movie')
+
+    async def _get(self, api_endpoint: yarl.URL, **kwargs) -> Optional[Any]:
+        """(Async) GETs an endpoint through this instance's shared session, within its concurrency limit."""
+        session = await _get_session(self.base_url, self.api_key, self.verify_tls)
+        # Auth header comes from the session; the limit is taken per attempt, not across retry sleeps
+        return await _radarr_get(session, api_endpoint, limiter=_get_semaphore(self.base_url), **kwargs)
+
+    async def ping(self, session: Optional[aiohttp.ClientSession] = None) -> bool:
+        """
+        (Async) Tests the connection and authentication to the Radarr API using /system/status.
+        Reuses the given aiohttp session if provided, otherwise the shared Radarr session.
+        """
+        # A caller-provided session doesn't carry the API key, so it is sent explicitly here
+        if session is None:
+            session = await _get_session(self.base_url, self.api_key, self.verify_tls)
+        api_endpoint = self.status_url
+        logger.info(f"Testing async Radarr connection to {api_endpoint}...")
+        # A single attempt with a shorter timeout: the status report should reflect an outage, not wait it out
+        status_data = await _radarr_get(
+            session, api_endpoint, headers=self.headers, description="Radarr connection test", max_retries=1,
+            ssl=_get_ssl_context(self.verify_tls), timeout=aiohttp.ClientTimeout(total=10)
+        )
+        if status_data is None:
+            return False
+        # Optionally check response content if needed, e.g., version
+        if isinstance(status_data, dict) and 'version' in status_data:
+             logger.info(f"Radarr connection test successful ({api_endpoint}, Version: {status_data.get('version', 'N/A')}).")
         else:
-            logger.error(f"Radarr connection test failed: HTTP error {e.status} connecting to {api_endpoint}")
-        return False
-    except aiohttp.ClientConnectionError as e:
-        logger.error(f"Radarr connection test failed ({api_endpoint}): Connection error - {e}")
-        return False
-    except Exception as e:
-         logger.error(f"An unexpected error occurred during Radarr connection test ({api_endpoint}): {e}", exc_info=True)
-         return False
-# --- *** END PING FUNCTION *** ---
+             logger.warning(f"Radarr connection test to {api_endpoint} successful, but response format unexpected: {status_data}")
+        return True # Any 2xx with a JSON body counts as success
+
+    async def search(self, search_term: str) -> Optional[List[MovieLite]]:
+        """(Async) Searches Radarr's movie lookup endpoint. Results carry only the fields search listings need."""
+        api_endpoint = self.lookup_url
+        logger.info(f"Sending async request to Radarr lookup: {api_endpoint} with term: '{search_term}'")
+        results = await self._get(api_endpoint, params={'term': search_term}, description="Radarr search")
+        if results is None:
+            return None
+        if not isinstance(results, list):
+            logger.error(f"Radarr API ({api_endpoint}) returned unexpected data type: {type(results)}. Expected list.")
+            return None
+        logger.info(f"Radarr lookup successful. Found {len(results)} potential matches for '{search_term}'.")
+        return [MovieLite.from_lookup(movie) for movie in results if isinstance(movie, dict)]
+
+    async def lookup_tmdb(self, tmdb_id: int) -> Optional[List[Dict[str, Any]]]:
+        """(Async) Looks up a Radarr movie by TMDb ID."""
+        api_endpoint = self.lookup_url
+        logger.info(f"Sending async request to Radarr TMDb lookup: {api_endpoint} for TMDb ID: {tmdb_id}")
+        # Use term parameter for TMDb lookup
+        results = await self._get(api_endpoint, params={'term': f"tmdb:{tmdb_id}"}, description=f"Radarr TMDb lookup for {tmdb_id}")
+        if results is None:
+            return None
+        if not isinstance(results, list):
+            logger.error(f"Radarr TMDb lookup API ({api_endpoint}) returned unexpected data type: {type(results)}. Expected list.")
+            return None
+        logger.info(f"Radarr TMDb lookup successful. Found {len(results)} matches for TMDb ID {tmdb_id}.")
+        # Radarr lookup might return multiple results even for ID lookup? Filter if needed.
+        # For now, return the whole list.
+        return results
 
+    async def movie_details(self, movie_id: int) -> Optional[Dict[str, Any]]:
+        """(Async) Gets details for a specific movie from Radarr."""
+        api_endpoint = self.movie_url / str(movie_id)
+        logger.info(f"Requesting async details for Radarr movie ID: {movie_id} from {api_endpoint}")
+        details = await self._get(
+            api_endpoint, description=f"Radarr details for movie ID {movie_id}",
+            etag_cache=_DETAILS_ETAG_CACHE, etag_key=(self.base_url, movie_id)
+        )
+        if details is None:
+            return None
+        if not isinstance(details, dict):
+            logger.error(f"Radarr details API ({api_endpoint}) returned unexpected data type: {type(details)}. Expected dict.")
+            return None
+        logger.info(f"Successfully retrieved details for Radarr movie ID: {movie_id}")
+        return details
 
-# --- Existing Radarr Service Functions ---
+@functools.lru_cache(maxsize=8)
+def get_radarr_client(radarr_url: str, api_key: str, verify_tls: bool = True) -> RadarrClient:
+    """Returns the RadarrClient for these settings, building it on first use."""
+    return RadarrClient(radarr_url, api_key, verify_tls)
 
-async def search_radarr_movie(search_term: str, radarr_url: str, api_key: str, verify_tls: bool = True) -> Optional[List[Dict[str, Any]]]:
-    """(Async) Searches Radarr's movie lookup endpoint."""
+# --- Module-Level Service Functions (thin wrappers around RadarrClient) ---
+async def ping_radarr(radarr_url: str, api_key: str, verify_tls: bool = True, session: Optional[aiohttp.ClientSession] = None) -> bool:
+    """(Async) Tests the connection and authentication to the Radarr API. See RadarrClient.ping."""
     if not radarr_url or not api_key:
-        logger.error("Radarr URL or API Key is not configured.")
-        return None
+        logger.error("Cannot test Radarr connection: URL or API Key is missing.")
+        return False
+    return await get_radarr_client(radarr_url, api_key, verify_tls).ping(session)
 
-    if not radarr_url.startswith(('http://', 'https://')):
-         radarr_url = 'http://' + radarr_url
-
-    api_endpoint = urljoin(radarr_url, '/api/v3/movie/lookup')
-    headers = {'X-Api-Key': api_key}
-    params = {'term': search_term}
-    ssl_context = _get_ssl_context(verify_tls)
-
-    try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
-            logger.info(f"Sending async request to Radarr lookup: {api_endpoint} with term: '{search_term}'")
-            async with session.get(api_endpoint, headers=headers, params=params, ssl=ssl_context) as response:
-                response.raise_for_status()
-                try:
-                    results = await response.json()
-                    if isinstance(results, list):
-                        logger.info(f"Radarr lookup successful. Found {len(results)} potential matches for '{search_term}'.")
-                        return results
-                    else:
-                        logger.error(f"Radarr API ({api_endpoint}) returned unexpected data type: {type(results)}. Expected list.")
-                        return None
-                except aiohttp.ContentTypeError:
-                    body_preview = await response.text()
-                    logger.error(f"Failed to decode JSON response from Radarr ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
-                    return None
-    except asyncio.TimeoutError:
-        logger.error(f"Error communicating with Radarr API ({api_endpoint}): Request timed out after {REQUEST_TIMEOUT} seconds.")
-        return None
-    except aiohttp.ClientResponseError as e:
-        logger.error(f"Error communicating with Radarr API ({api_endpoint}): HTTP {e.status} - {e.message}")
-        try: body_preview = await e.response.text(); logger.error(f"Radarr API Response Body (partial): {body_preview[:200]}...")
-        except Exception: pass
-        return None
-    except aiohttp.ClientConnectionError as e:
-        logger.error(f"Error communicating with Radarr API ({api_endpoint}): Connection error - {e}")
-        return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during Radarr search ({api_endpoint}): {e}", exc_info=True)
+# --- Response Caches ---
+# Lookups are repeated often (several users asking about the same movie) and change slowly.
+# Lookup results also say whether a movie is already added, so entries are kept under a minute.
+_SEARCH_CACHE = TTLCache(maxsize=256, ttl=30)
+_TMDB_LOOKUP_CACHE = TTLCache(maxsize=256, ttl=60)
+
+@ttl_cached(_SEARCH_CACHE, key=lambda search_term, radarr_url, api_key, verify_tls=True: (radarr_url, search_term.strip().lower()))
+async def search_radarr_movie(search_term: str, radarr_url: str, api_key: str, verify_tls: bool = True) -> Optional[List[MovieLite]]:
+    """(Async) Searches Radarr's movie lookup endpoint. See RadarrClient.search."""
+    if not radarr_url or not api_key:
+        logger.error("Radarr URL or API Key is not configured.")
         return None
+    return await get_radarr_client(radarr_url, api_key, verify_tls).search(search_term)
 
 
+@ttl_cached(_TMDB_LOOKUP_CACHE, key=lambda tmdb_id, radarr_url, api_key, verify_tls=True: (radarr_url, tmdb_id))
 async def lookup_radarr_movie_by_tmdb(tmdb_id: int, radarr_url: str, api_key: str, verify_tls: bool = True) -> Optional[List[Dict[str, Any]]]:
-     """(Async) Looks up a Radarr movie by TMDb ID."""
-     if not radarr_url or not api_key: logger.error("Radarr URL or API Key is not configured."); return None
-     if not tmdb_id or tmdb_id <= 0: logger.error("Invalid TMDb ID provided for lookup."); return None
-
-     if not radarr_url.startswith(('http://', 'https://')): radarr_url = 'http://' + radarr_url
-
-     api_endpoint = urljoin(radarr_url, '/api/v3/movie/lookup')
-     headers = {'X-Api-Key': api_key}
-     params = {'term': f"tmdb:{tmdb_id}"} # Use term parameter for TMDb lookup
-     ssl_context = _get_ssl_context(verify_tls)
-
-     try:
-         async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
-             logger.info(f"Sending async request to Radarr TMDb lookup: {api_endpoint} for TMDb ID: {tmdb_id}")
-             async with session.get(api_endpoint, headers=headers, params=params, ssl=ssl_context) as response:
-                 response.raise_for_status()
-                 try:
-                     results = await response.json()
-                     if isinstance(results, list):
-                         logger.info(f"Radarr TMDb lookup successful. Found {len(results)} matches for TMDb ID {tmdb_id}.")
-                         # Radarr lookup might return multiple results even for ID lookup? Filter if needed.
-                         # For now, return the whole list.
-                         return results
-                     else:
-                         logger.error(f"Radarr TMDb lookup API ({api_endpoint}) returned unexpected data type: {type(results)}. Expected list.")
-                         return None
-                 except aiohttp.ContentTypeError:
-                     body_preview = await response.text()
-                     logger.error(f"Failed to decode JSON response from Radarr TMDb lookup API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
-                     return None
-     except asyncio.TimeoutError:
-         logger.error(f"Error looking up Radarr movie by TMDb ID {tmdb_id} ({api_endpoint}): Request timed out.")
-         return None
-     except aiohttp.ClientResponseError as e:
-         logger.error(f"Error looking up Radarr movie by TMDb ID {tmdb_id} ({api_endpoint}): HTTP {e.status} - {e.message}")
-         try: body_preview = await e.response.text(); logger.error(f"Radarr TMDb Lookup API Response Body (partial): {body_preview[:200]}...")
-         except Exception: pass
-         return None
-     except aiohttp.ClientConnectionError as e:
-         logger.error(f"Error looking up Radarr movie by TMDb ID {tmdb_id} ({api_endpoint}): Connection error - {e}")
-         return None
-     except Exception as e:
-         logger.error(f"An unexpected error occurred fetching Radarr movie by TMDb ID ({api_endpoint}): {e}", exc_info=True)
-         return None
+    """(Async) Looks up a Radarr movie by TMDb ID. See RadarrClient.lookup_tmdb."""
+    if not radarr_url or not api_key: logger.error("Radarr URL or API Key is not configured."); return None
+    if not tmdb_id or tmdb_id <= 0: logger.error("Invalid TMDb ID provided for lookup."); return None
+    return await get_radarr_client(radarr_url, api_key, verify_tls).lookup_tmdb(tmdb_id)
 
 
 async def get_radarr_movie_details(movie_id: int, radarr_url: str, api_key: str, verify_tls: bool = True) -> Optional[Dict[str, Any]]:
-    """(Async) Gets details for a specific movie from Radarr."""
+    """(Async) Gets details for a specific movie from Radarr. See RadarrClient.movie_details."""
     if not radarr_url or not api_key: logger.error("Radarr URL or API Key is not configured."); return None
     if not movie_id or movie_id <= 0: logger.error("Invalid movie_id provided for details lookup."); return None
+    return await get_radarr_client(radarr_url, api_key, verify_tls).movie_details(movie_id)
 
-    if not radarr_url.startswith(('http://', 'https://')): radarr_url = 'http://' + radarr_url
-
-    api_endpoint = urljoin(radarr_url, f'/api/v3/movie/{movie_id}')
-    headers = {'X-Api-Key': api_key}
-    ssl_context = _get_ssl_context(verify_tls)
-
-    try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
-            logger.info(f"Requesting async details for Radarr movie ID: {movie_id} from {api_endpoint}")
-            async with session.get(api_endpoint, headers=headers, ssl=ssl_context) as response:
-                response.raise_for_status()
-                try:
-                    details = await response.json()
-                    if isinstance(details, dict):
-                        logger.info(f"Successfully retrieved details for Radarr movie ID: {movie_id}")
-                        return details
-                    else:
-                        logger.error(f"Radarr details API ({api_endpoint}) returned unexpected data type: {type(details)}. Expected dict.")
-                        return None
-                except aiohttp.ContentTypeError:
-                    body_preview = await response.text()
-                    logger.error(f"Failed to decode JSON response from Radarr details API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
-                    return None
-    except asyncio.TimeoutError:
-        logger.error(f"Error getting details for Radarr movie ID {movie_id} ({api_endpoint}): Request timed out.")
-        return None
-    except aiohttp.ClientResponseError as e:
-        logger.error(f"Error getting details for Radarr movie ID {movie_id} ({api_endpoint}): HTTP {e.status} - {e.message}")
-        try: body_preview = await e.response.text(); logger.error(f"Radarr Details API Response Body (partial): {body_preview[:200]}...")
-        except Exception: pass
-        return None
-    except aiohttp.ClientConnectionError as e:
-        logger.error(f"Error getting details for Radarr movie ID {movie_id} ({api_endpoint}): Connection error - {e}")
-        return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred fetching Radarr movie details ({api_endpoint}): {e}", exc_info=True)
-        return None
+# --- Bulk Helpers ---
+# Requests are already capped per instance at RADARR_MAX_CONCURRENCY by the client, so these just gather
+async def bulk_get_radarr_movie_details(movie_ids: List[int], radarr_url: str, api_key: str, verify_tls: bool = True) -> List[Optional[Dict[str, Any]]]:
+    """(Async) Gets details for several Radarr movies concurrently. Results are in input order; failures are None."""
+    return await asyncio.gather(*(
+        get_radarr_movie_details(movie_id, radarr_url, api_key, verify_tls=verify_tls) for movie_id in movie_ids
+    ))
 
-# ... (other radarr service functions if any) ...
+async def bulk_lookup_radarr_movie_by_tmdb(tmdb_ids: List[int], radarr_url: str, api_key: str, verify_tls: bool = True) -> List[Optional[List[Dict[str, Any]]]]:
+    """(Async) Looks up several movies by TMDb ID concurrently. Results are in input order; failures are None."""
+    return await asyncio.gather(*(
+        lookup_radarr_movie_by_tmdb(tmdb_id, radarr_url, api_key, verify_tls=verify_tls) for tmdb_id in tmdb_ids
+    ))
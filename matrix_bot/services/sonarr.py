@@ -1,8 +1,13 @@
 import asyncio # Added
 import aiohttp  # Added
+import functools
 import logging
 from urllib.parse import urljoin
 import ssl      # Added for verify_tls handling
+from typing import Dict, Optional
+
+from ..utils import json_utils
+from ..utils.cache import TTLCache, ttl_cached
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +15,9 @@ logger = logging.getLogger(__name__)
 REQUEST_TIMEOUT = 15
 
 # --- Helper for TLS verification ---
+# Cached: building a context parses the CA bundle, and the "verification disabled" warning
+# should be logged once rather than for every request.
+@functools.lru_cache(maxsize=2)
 def _get_ssl_context(verify_tls: bool):
     if verify_tls:
         return None # Use default SSL context which verifies
@@ -22,6 +30,41 @@ def _get_ssl_context(verify_tls: bool):
         logger.warning("TLS verification is DISABLED for Sonarr requests.")
         return context
 
+# --- Shared HTTP Sessions ---
+# One pooled session per verify_tls mode for all Sonarr calls, so repeat requests reuse keep-alive
+# connections instead of paying a new TCP + TLS handshake each time. The ssl context lives on the connector.
+_sessions: Dict[bool, aiohttp.ClientSession] = {}
+
+async def _get_session(verify_tls: bool) -> aiohttp.ClientSession:
+    """(Async) Returns the shared Sonarr session for this TLS mode, creating it on first use."""
+    session = _sessions.get(verify_tls)
+    if session is None or session.closed:
+        ssl_context = _get_ssl_context(verify_tls)
+        session = _sessions[verify_tls] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=20, limit_per_host=10, ttl_dns_cache=300, keepalive_timeout=60,
+                ssl=ssl_context if ssl_context is not None else True
+            ),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+    return session
+
+async def close_sonarr_session():
+    """(Async) Closes the shared Sonarr sessions, if any were opened."""
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
+
+# --- Response Caches ---
+# Repeat searches and detail fetches within the TTL are served from memory instead of Sonarr.
+# Lookup results also say whether a series is already added, so entries are kept under a minute.
+_LOOKUP_CACHE = TTLCache(maxsize=256, ttl=30)
+_SERIES_DETAILS_CACHE = TTLCache(maxsize=512, ttl=60)
+_ALL_SERIES_CACHE = TTLCache(maxsize=8, ttl=60) # One entry per Sonarr URL
+
+@ttl_cached(_LOOKUP_CACHE, key=lambda query, sonarr_url, api_key, verify_tls=True: (sonarr_url, query))
 async def search_sonarr_lookup(query: str, sonarr_url: str, api_key: str, verify_tls: bool = True) -> list | None:
     """
     (Async) Searches Sonarr for potential series matches using the /series/lookup endpoint.
@@ -37,25 +80,24 @@ async def search_sonarr_lookup(query: str, sonarr_url: str, api_key: str, verify
     api_endpoint = urljoin(sonarr_url, '/api/v3/series/lookup')
     headers = {'X-Api-Key': api_key}
     params = {'term': query}
-    ssl_context = _get_ssl_context(verify_tls)
 
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
-            logger.info(f"Sending async request to Sonarr lookup: {api_endpoint} with term: '{query}'")
-            async with session.get(api_endpoint, headers=headers, params=params, ssl=ssl_context) as response:
-                response.raise_for_status() # Raise exception for 4xx/5xx status
-                try:
-                    results = await response.json()
-                    if isinstance(results, list):
-                        logger.info(f"Sonarr lookup successful. Found {len(results)} potential matches for '{query}'.")
-                        return results
-                    else:
-                        logger.error(f"Sonarr API ({api_endpoint}) returned unexpected data type: {type(results)}. Expected list.")
-                        return None
-                except aiohttp.ContentTypeError: # Handles JSON decoding errors in aiohttp
-                    body_preview = await response.text()
-                    logger.error(f"Failed to decode JSON response from Sonarr ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+        session = await _get_session(verify_tls)
+        logger.info(f"Sending async request to Sonarr lookup: {api_endpoint} with term: '{query}'")
+        async with session.get(api_endpoint, headers=headers, params=params) as response:
+            response.raise_for_status() # Raise exception for 4xx/5xx status
+            try:
+                results = await response.json(loads=json_utils.loads)
+                if isinstance(results, list):
+                    logger.info(f"Sonarr lookup successful. Found {len(results)} potential matches for '{query}'.")
+                    return results
+                else:
+                    logger.error(f"Sonarr API ({api_endpoint}) returned unexpected data type: {type(results)}. Expected list.")
                     return None
+            except aiohttp.ContentTypeError: # Handles JSON decoding errors in aiohttp
+                body_preview = await response.text()
+                logger.error(f"Failed to decode JSON response from Sonarr ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+                return None
     except asyncio.TimeoutError:
         logger.error(f"Error communicating with Sonarr API ({api_endpoint}): Request timed out after {REQUEST_TIMEOUT} seconds.")
         return None
@@ -76,6 +118,7 @@ async def search_sonarr_lookup(query: str, sonarr_url: str, api_key: str, verify
         return None
 
 
+@ttl_cached(_SERIES_DETAILS_CACHE, key=lambda series_id, sonarr_url, api_key, verify_tls=True: (sonarr_url, series_id))
 async def get_sonarr_series_details(series_id: int, sonarr_url: str, api_key: str, verify_tls: bool = True) -> dict | None:
     """
     (Async) Retrieves the full details for a specific series already in Sonarr.
@@ -92,25 +135,24 @@ async def get_sonarr_series_details(series_id: int, sonarr_url: str, api_key: st
 
     api_endpoint = urljoin(sonarr_url, f'/api/v3/series/{series_id}')
     headers = {'X-Api-Key': api_key}
-    ssl_context = _get_ssl_context(verify_tls)
 
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
-            logger.info(f"Requesting async details for Sonarr series ID: {series_id} from {api_endpoint}")
-            async with session.get(api_endpoint, headers=headers, ssl=ssl_context) as response:
-                response.raise_for_status()
-                try:
-                    details = await response.json()
-                    if isinstance(details, dict):
-                        logger.info(f"Successfully retrieved details for Sonarr series ID: {series_id}")
-                        return details
-                    else:
-                        logger.error(f"Sonarr details API ({api_endpoint}) returned unexpected data type: {type(details)}. Expected dict.")
-                        return None
-                except aiohttp.ContentTypeError:
-                    body_preview = await response.text()
-                    logger.error(f"Failed to decode JSON response from Sonarr details API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+        session = await _get_session(verify_tls)
+        logger.info(f"Requesting async details for Sonarr series ID: {series_id} from {api_endpoint}")
+        async with session.get(api_endpoint, headers=headers) as response:
+            response.raise_for_status()
+            try:
+                details = await response.json(loads=json_utils.loads)
+                if isinstance(details, dict):
+                    logger.info(f"Successfully retrieved details for Sonarr series ID: {series_id}")
+                    return details
+                else:
+                    logger.error(f"Sonarr details API ({api_endpoint}) returned unexpected data type: {type(details)}. Expected dict.")
                     return None
+            except aiohttp.ContentTypeError:
+                body_preview = await response.text()
+                logger.error(f"Failed to decode JSON response from Sonarr details API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+                return None
     except asyncio.TimeoutError:
         logger.error(f"Error getting details for Sonarr series ID {series_id} ({api_endpoint}): Request timed out after {REQUEST_TIMEOUT} seconds.")
         return None
@@ -129,6 +171,52 @@ async def get_sonarr_series_details(series_id: int, sonarr_url: str, api_key: st
         logger.error(f"An unexpected error occurred fetching Sonarr series details ({api_endpoint}): {e}", exc_info=True)
         return None
 
+@ttl_cached(_ALL_SERIES_CACHE, key=lambda sonarr_url, api_key, verify_tls=True: sonarr_url)
+async def get_all_sonarr_series_indexed(sonarr_url: str, api_key: str, verify_tls: bool = True) -> dict | None:
+    """
+    (Async) Retrieves every series in Sonarr with one /series call, indexed by Sonarr series ID.
+    Lets callers resolve many series locally instead of one /series/{id} request each.
+    """
+    if not sonarr_url or not api_key:
+        logger.error("Sonarr URL or API Key is not configured for fetching the series list.")
+        return None
+
+    if not sonarr_url.startswith(('http://', 'https://')):
+         sonarr_url = 'http://' + sonarr_url
+
+    api_endpoint = urljoin(sonarr_url, '/api/v3/series')
+    headers = {'X-Api-Key': api_key}
+
+    try:
+        session = await _get_session(verify_tls)
+        logger.info(f"Requesting async list of all Sonarr series from {api_endpoint}")
+        async with session.get(api_endpoint, headers=headers) as response:
+            response.raise_for_status()
+            try:
+                series_list = await response.json(loads=json_utils.loads)
+                if isinstance(series_list, list):
+                    logger.info(f"Successfully retrieved {len(series_list)} series from Sonarr.")
+                    return {series['id']: series for series in series_list if isinstance(series, dict) and 'id' in series}
+                else:
+                    logger.error(f"Sonarr series API ({api_endpoint}) returned unexpected data type: {type(series_list)}. Expected list.")
+                    return None
+            except aiohttp.ContentTypeError:
+                body_preview = await response.text()
+                logger.error(f"Failed to decode JSON response from Sonarr series API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+                return None
+    except asyncio.TimeoutError:
+        logger.error(f"Error getting Sonarr series list ({api_endpoint}): Request timed out after {REQUEST_TIMEOUT} seconds.")
+        return None
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"Error getting Sonarr series list ({api_endpoint}): HTTP {e.status} - {e.message}")
+        return None
+    except aiohttp.ClientConnectionError as e:
+        logger.error(f"Error getting Sonarr series list ({api_endpoint}): Connection error - {e}")
+        return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred fetching the Sonarr series list ({api_endpoint}): {e}", exc_info=True)
+        return None
+
 # --- NEW FUNCTION ---
 async def get_sonarr_episode_details(episode_id: int, sonarr_url: str, api_key: str, verify_tls: bool = True) -> dict | None:
     """
@@ -157,30 +245,29 @@ async def get_sonarr_episode_details(episode_id: int, sonarr_url: str, api_key:
     # Construct the specific episode endpoint URL
     api_endpoint = urljoin(sonarr_url, f'/api/v3/episode/{episode_id}')
     headers = {'X-Api-Key': api_key}
-    ssl_context = _get_ssl_context(verify_tls)
 
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
-            logger.info(f"Requesting async details for Sonarr episode ID: {episode_id} from {api_endpoint}")
-            async with session.get(api_endpoint, headers=headers, ssl=ssl_context) as response:
-                response.raise_for_status() # Check for HTTP errors
-
-                try:
-                    details = await response.json()
-                    # The episode endpoint returns the episode object directly, often including a nested 'series' object
-                    if isinstance(details, dict) and 'series' in details:
-                        logger.info(f"Successfully retrieved details for Sonarr episode ID: {episode_id} (Title: '{details.get('title', 'N/A')}')")
-                        return details
-                    elif isinstance(details, dict):
-                         logger.warning(f"Sonarr episode details API ({api_endpoint}) returned a dict, but missing 'series' info. Episode ID: {episode_id}")
-                         return details # Return partial data? Or None? Decide based on need. Returning dict for now.
-                    else:
-                        logger.error(f"Sonarr episode details API ({api_endpoint}) returned unexpected data type: {type(details)}. Expected dict.")
-                        return None
-                except aiohttp.ContentTypeError:
-                    body_preview = await response.text()
-                    logger.error(f"Failed to decode JSON response from Sonarr episode details API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+        session = await _get_session(verify_tls)
+        logger.info(f"Requesting async details for Sonarr episode ID: {episode_id} from {api_endpoint}")
+        async with session.get(api_endpoint, headers=headers) as response:
+            response.raise_for_status() # Check for HTTP errors
+
+            try:
+                details = await response.json(loads=json_utils.loads)
+                # The episode endpoint returns the episode object directly, often including a nested 'series' object
+                if isinstance(details, dict) and 'series' in details:
+                    logger.info(f"Successfully retrieved details for Sonarr episode ID: {episode_id} (Title: '{details.get('title', 'N/A')}')")
+                    return details
+                elif isinstance(details, dict):
+                     logger.warning(f"Sonarr episode details API ({api_endpoint}) returned a dict, but missing 'series' info. Episode ID: {episode_id}")
+                     return details # Return partial data? Or None? Decide based on need. Returning dict for now.
+                else:
+                    logger.error(f"Sonarr episode details API ({api_endpoint}) returned unexpected data type: {type(details)}. Expected dict.")
                     return None
+            except aiohttp.ContentTypeError:
+                body_preview = await response.text()
+                logger.error(f"Failed to decode JSON response from Sonarr episode details API ({api_endpoint}). Status: {response.status}, Body: {body_preview[:200]}...")
+                return None
 
     except asyncio.TimeoutError:
         logger.error(f"Error getting details for Sonarr episode ID {episode_id} ({api_endpoint}): Request timed out after {REQUEST_TIMEOUT} seconds.")
@@ -202,8 +289,11 @@ async def get_sonarr_episode_details(episode_id: int, sonarr_url: str, api_key:
 # --- END NEW FUNCTION ---
 
 
-async def test_sonarr_connection(sonarr_url: str, api_key: str, verify_tls: bool = True) -> bool:
-    """(Async) Tests the connection and authentication to the Sonarr API using /system/status."""
+async def test_sonarr_connection(sonarr_url: str, api_key: str, verify_tls: bool = True, session: Optional[aiohttp.ClientSession] = None) -> bool:
+    """
+    (Async) Tests the connection and authentication to the Sonarr API using /system/status.
+    Reuses the given aiohttp session if provided, otherwise the shared Sonarr session.
+    """
     if not sonarr_url or not api_key:
         logger.error("Cannot test Sonarr connection: URL or API Key is missing.")
         return False
@@ -215,15 +305,16 @@ async def test_sonarr_connection(sonarr_url: str, api_key: str, verify_tls: bool
     headers = {'X-Api-Key': api_key}
     ssl_context = _get_ssl_context(verify_tls)
 
+    if session is None:
+        session = await _get_session(verify_tls)
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session: # Shorter timeout for test
-            logger.info(f"Testing async Sonarr connection to {api_endpoint}...")
-            async with session.get(api_endpoint, headers=headers, ssl=ssl_context) as response:
-                response.raise_for_status()
-                # Optionally check response content if needed
-                # status_data = await response.json()
-                logger.info(f"Sonarr connection test successful ({api_endpoint}).")
-                return True
+        logger.info(f"Testing async Sonarr connection to {api_endpoint}...")
+        async with session.get(api_endpoint, headers=headers, ssl=ssl_context, timeout=aiohttp.ClientTimeout(total=10)) as response: # Shorter timeout for test
+            response.raise_for_status()
+            # Optionally check response content if needed
+            # status_data = await response.json()
+            logger.info(f"Sonarr connection test successful ({api_endpoint}).")
+            return True
     except asyncio.TimeoutError:
         logger.error(f"Sonarr connection test failed: Timeout connecting to {api_endpoint}")
         return False
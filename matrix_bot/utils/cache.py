@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# --- Small In-Process TTL Cache ---
+class TTLCache:
+    """
+    A size-bounded LRU cache whose entries expire after `ttl` seconds.
+    Meant for short-lived memoization of *arr API responses inside the event loop
+    (not thread-safe; all access happens on the asyncio thread).
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict() # key -> (expires_at, value), oldest first
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Returns the cached value for key, or default if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        """Drops every cached entry."""
+        self._data.clear()
+
+
+def ttl_cached(cache: TTLCache, key: Callable[..., Hashable]):
+    """
+    Decorator for async functions: serves repeat calls from `cache`.
+    `key` receives the call's arguments and returns the cache key. Failed calls (None) are not cached.
+    Concurrent calls with the same key share one in-flight call instead of each starting their own.
+    """
+    def decorator(func):
+        inflight: Dict[Hashable, asyncio.Task] = {} # cache key -> running call
+
+        async def _fill(cache_key, args, kwargs):
+            try:
+                result = await func(*args, **kwargs)
+                if result is not None:
+                    cache[cache_key] = result
+                return result
+            finally:
+                inflight.pop(cache_key, None)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+            task = inflight.get(cache_key)
+            if task is None:
+                task = inflight[cache_key] = asyncio.ensure_future(_fill(cache_key, args, kwargs))
+            # Shielded so one cancelled caller doesn't cancel the call other callers are waiting on
+            return await asyncio.shield(task)
+        wrapper.cache = cache
+        return wrapper
+    return decorator
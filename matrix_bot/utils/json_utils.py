@@ -0,0 +1,17 @@
+import json
+
+# --- Fast JSON Helpers ---
+# orjson parses and serializes several times faster than the stdlib json module.
+# Fall back to the standard library if it is not installed.
+try:
+    import orjson
+
+    loads = orjson.loads
+
+    def dumps(obj) -> str:
+        """Serializes an object to a JSON string."""
+        return orjson.dumps(obj).decode()
+
+except ImportError:
+    loads = json.loads
+    dumps = json.dumps
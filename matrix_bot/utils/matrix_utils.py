@@ -2,6 +2,7 @@ import logging
 import re           # For slugify
 import asyncio      # For image upload helper
 import requests     # For image download helper
+import aiohttp      # For shared-session image download helper
 import io           # For image upload helper
 import os           # For image upload helper
 import html         # For escaping in old card sender (if kept/adapted) or help
@@ -60,16 +61,55 @@ def _sync_download_image(image_url: str, config: config_module.MyConfig) -> Opti
         logger.error(f"Unexpected error downloading image {image_url}: {e}", exc_info=True)
         return None
 
+# --- Image Download Helper (Async - Shared Session) ---
+async def _download_image(session: aiohttp.ClientSession, image_url: str, config: config_module.MyConfig) -> Optional[Dict[str, Any]]:
+    """Downloads an image using a shared aiohttp session, reusing its pooled connections."""
+    if not image_url: return None
+    logger.info(f"Downloading image from {image_url}...")
+    try:
+        headers = {'User-Agent': 'Mozilla/5.0'} # Basic user agent
+        ssl_param = None if config.verify_tls else False # False disables certificate checks
+        async with session.get(image_url, headers=headers, ssl=ssl_param, timeout=aiohttp.ClientTimeout(total=45)) as r_download:
+            r_download.raise_for_status()
+            img_bytes: bytes = await r_download.read()
+            content_type: str = r_download.headers.get("Content-Type", "application/octet-stream")
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout downloading image: {image_url}")
+        return None
+    except aiohttp.InvalidURL:
+        logger.error(f"Invalid URL for image download: '{image_url}'")
+        return None
+    except aiohttp.ClientError as e:
+        logger.error(f"Failed to download image from {image_url}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error downloading image {image_url}: {e}", exc_info=True)
+        return None
+    # Basic validation
+    if not img_bytes or content_type.startswith("text/html"):
+        logger.warning(f"Invalid image data or HTML page received from {image_url}")
+        return None
+    if not content_type.startswith('image/'):
+        logger.warning(f"Content type '{content_type}' from {image_url} might not be an image.")
+    logger.info(f"Image downloaded ({len(img_bytes)} bytes, type: {content_type}).")
+    return {"data": img_bytes, "content_type": content_type, "size": len(img_bytes)}
+
 # --- Matrix Image Upload Helper (Async - from Old Code) ---
-async def upload_image_to_matrix(matrix_client: AsyncClient, image_url: str, config: config_module.MyConfig) -> str:
-    """Downloads an image and uploads it to Matrix, returning the MXC URI."""
+async def upload_image_to_matrix(matrix_client: AsyncClient, image_url: str, config: config_module.MyConfig, session: Optional[aiohttp.ClientSession] = None) -> str:
+    """
+    Downloads an image and uploads it to Matrix, returning the MXC URI.
+    Downloads through the shared aiohttp session when given, otherwise via requests in a thread.
+    """
     if not image_url: return ""
     if not matrix_client or not matrix_client.access_token:
         logger.error("Matrix client not ready or not logged in for image upload.")
         return ""
 
-    # Run synchronous download in a separate thread
-    download_result = await asyncio.to_thread(_sync_download_image, image_url, config)
+    if session is not None:
+        download_result = await _download_image(session, image_url, config)
+    else:
+        # Run synchronous download in a separate thread
+        download_result = await asyncio.to_thread(_sync_download_image, image_url, config)
     if not download_result:
         logger.warning(f"Failed to download image {image_url} for Matrix upload.")
         return ""
@@ -156,8 +196,11 @@ def get_nested(data: dict | list, *keys, default=None):
     return current
 
 # --- Media Info Card Sender (Updated to use MXC URI) ---
-async def send_media_info_card(bot, room_id: str, media_data: dict, is_added: bool, config, media_type: str):
-    """Sends a formatted card notification to Matrix, uploading poster to get MXC URI."""
+async def send_media_info_card(bot, room_id: str, media_data: dict, is_added: bool, config, media_type: str, session: Optional[aiohttp.ClientSession] = None):
+    """
+    Sends a formatted card notification to Matrix, uploading poster to get MXC URI.
+    If a shared aiohttp session is given, the poster is downloaded through it.
+    """
 
     if not media_data:
         logger.error("send_media_info_card called with empty media_data.")
@@ -249,7 +292,7 @@ async def send_media_info_card(bot, room_id: str, media_data: dict, is_added: bo
     mxc_uri = ""
     if poster_url_http:
         # Pass the underlying nio client (bot.api.async_client) to the upload helper
-        mxc_uri = await upload_image_to_matrix(bot.api.async_client, poster_url_http, config)
+        mxc_uri = await upload_image_to_matrix(bot.api.async_client, poster_url_http, config, session=session)
         if not mxc_uri:
              logger.warning(f"Failed to upload poster {poster_url_http} to Matrix. Card will not have image.")
     # --- *** END FIX *** ---
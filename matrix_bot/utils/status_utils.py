@@ -1,5 +1,6 @@
 import logging
 from typing import Tuple, Dict, Optional
+import aiohttp
 import simplematrixbotlib as botlib
 import asyncio
 
@@ -7,9 +8,16 @@ import asyncio
 from ..services import sonarr as sonarr_service
 from ..services import radarr as radarr_service
 from .. import config as config_module
+from .cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Last full report, kept briefly so bursts of !status collapse into one set of live probes
+STATUS_CACHE_TTL = 5.0
+_RESULTS_CACHE = TTLCache(maxsize=1, ttl=STATUS_CACHE_TTL)
+# The probe run currently in progress; concurrent callers await it instead of starting their own
+_inflight: Optional[asyncio.Task] = None
+
 async def check_matrix_connection(bot: botlib.Bot) -> Tuple[bool, str]:
     """Checks if the bot can communicate with the Matrix homeserver."""
     try:
@@ -29,14 +37,14 @@ async def check_matrix_connection(bot: botlib.Bot) -> Tuple[bool, str]:
         logger.error(f"Matrix connection check failed: {e}", exc_info=True)
         return False, f"Failed: {type(e).__name__}"
 
-async def check_sonarr_connection(config: config_module.MyConfig) -> Tuple[bool, str]:
+async def check_sonarr_connection(config: config_module.MyConfig, session: Optional[aiohttp.ClientSession] = None) -> Tuple[bool, str]:
     """Checks if Sonarr is reachable and API key is valid using test_sonarr_connection."""
     if not config.sonarr_url or not config.sonarr_api_key:
         return False, "Not Configured"
     try:
         # FIX 2: Use test_sonarr_connection
         success = await sonarr_service.test_sonarr_connection(
-            config.sonarr_url, config.sonarr_api_key, verify_tls=config.verify_tls
+            config.sonarr_url, config.sonarr_api_key, verify_tls=config.verify_tls, session=session
         )
         if success:
             logger.info("Sonarr connection check successful.")
@@ -52,14 +60,14 @@ async def check_sonarr_connection(config: config_module.MyConfig) -> Tuple[bool,
         logger.error(f"Sonarr connection check failed with exception: {e}", exc_info=True)
         return False, f"Error: {type(e).__name__}"
 
-async def check_radarr_connection(config: config_module.MyConfig) -> Tuple[bool, str]:
+async def check_radarr_connection(config: config_module.MyConfig, session: Optional[aiohttp.ClientSession] = None) -> Tuple[bool, str]:
     """Checks if Radarr is reachable and API key is valid using ping_radarr."""
     if not config.radarr_url or not config.radarr_api_key:
         return False, "Not Configured"
     try:
         # Ensure ping_radarr exists in services/radarr.py (User Action Required if error persists)
         success = await radarr_service.ping_radarr(
-            config.radarr_url, config.radarr_api_key, verify_tls=config.verify_tls
+            config.radarr_url, config.radarr_api_key, verify_tls=config.verify_tls, session=session
         )
         if success:
             logger.info("Radarr connection check successful.")
@@ -75,35 +83,65 @@ async def check_radarr_connection(config: config_module.MyConfig) -> Tuple[bool,
         logger.error(f"Radarr connection check failed with exception: {e}", exc_info=True)
         return False, f"Error: {type(e).__name__}"
 
-async def check_all_services(bot: botlib.Bot, config: config_module.MyConfig) -> Dict[str, Tuple[bool, str]]:
-    """Performs connectivity checks for all configured services."""
+async def _run_all_checks(bot: botlib.Bot, config: config_module.MyConfig, session: Optional[aiohttp.ClientSession]) -> Dict[str, Tuple[bool, str]]:
+    """(Async) Runs one set of live probes and caches the results."""
     logger.info("Performing status check for all services...")
+    # Run the checks concurrently so the report waits on the slowest service, not the sum of all.
+    # An exception in one check is reported for that service only; it doesn't cancel the others.
+    checks = {
+        "Matrix": check_matrix_connection(bot),
+        "Sonarr": check_sonarr_connection(config, session),
+        "Radarr": check_radarr_connection(config, session),
+    }
+    outcomes = await asyncio.gather(*checks.values(), return_exceptions=True)
     results = {}
-    results["Matrix"] = await check_matrix_connection(bot)
-    results["Sonarr"] = await check_sonarr_connection(config)
-    results["Radarr"] = await check_radarr_connection(config)
+    for name, outcome in zip(checks, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"{name} status check raised an unexpected error: {outcome}", exc_info=outcome)
+            results[name] = (False, f"Error: {type(outcome).__name__}")
+        else:
+            results[name] = outcome
     logger.info("Finished status check.")
+    _RESULTS_CACHE["all"] = results
     return results
 
+async def check_all_services(bot: botlib.Bot, config: config_module.MyConfig, session: Optional[aiohttp.ClientSession] = None, force: bool = False) -> Dict[str, Tuple[bool, str]]:
+    """
+    Performs connectivity checks for all configured services concurrently.
+    If an aiohttp session is given, the service checks use it; otherwise they use the
+    pooled sessions of the Sonarr and Radarr service modules.
+    Results younger than STATUS_CACHE_TTL seconds are returned as-is unless force is set,
+    and callers arriving while a check is running share its results.
+    """
+    global _inflight
+    if not force:
+        cached = _RESULTS_CACHE.get("all")
+        if cached is not None:
+            logger.info("Returning cached status check results.")
+            return cached
+
+    if _inflight is None or _inflight.done():
+        _inflight = asyncio.ensure_future(_run_all_checks(bot, config, session))
+    else:
+        logger.info("Status check already in progress; waiting for its results.")
+    # Shielded so a cancelled caller doesn't cancel the probes other callers are waiting on
+    return await asyncio.shield(_inflight)
+
 def format_status_report(status_results: Dict[str, Tuple[bool, str]]) -> Tuple[str, str]:
     """Formats the status check results into plain text and HTML."""
-    plain_body = "Service Status Report:\n"
-    html_body = "<h3>Service Status Report</h3><ul>"
+    plain_rows = []
+    html_rows = []
     overall_ok = True
 
     for service, (success, message) in status_results.items():
         emoji = "✅" if success else "❌"
-        plain_body += f"\n{emoji} {service}: {message}"
-        html_body += f"<li>{emoji} <strong>{service}:</strong> {message}</li>"
+        plain_rows.append(f"\n{emoji} {service}: {message}")
+        html_rows.append(f"<li>{emoji} <strong>{service}:</strong> {message}</li>")
         if not success and message not in ["Not Configured"]:
             overall_ok = False
 
-    html_body += "</ul>"
-    if overall_ok:
-        plain_body += "\n\nOverall Status: OK"
-        html_body += "<p><strong>Overall Status: OK</strong></p>"
-    else:
-        plain_body += "\n\nOverall Status: Issues Detected"
-        html_body += "<p><strong>Overall Status: Issues Detected</strong></p>"
+    overall = "OK" if overall_ok else "Issues Detected"
+    plain_body = f"Service Status Report:\n{''.join(plain_rows)}\n\nOverall Status: {overall}"
+    html_body = f"<h3>Service Status Report</h3><ul>{''.join(html_rows)}</ul><p><strong>Overall Status: {overall}</strong></p>"
 
-    return plain_body, html_body
\ No newline at end of file
+    return plain_body, html_body